@@ -0,0 +1,172 @@
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config import BAR_STORE_DIR, BAR_STORE_MAX_BARS, MARKET_DATA_PROVIDER
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# One fixed-size record per bar, timestamps are bar open times in epoch seconds (UTC)
+BAR_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+])
+
+EMPTY_BARS = np.empty(0, dtype=BAR_DTYPE)
+
+
+def frame_to_bars(df):
+    """Convert an OHLCV frame with a DatetimeIndex into a sorted bar array"""
+    required_columns = ['Open', 'High', 'Low', 'Close']
+    if not all(col in df.columns for col in required_columns):
+        logger.error(f"Missing required columns. Available: {df.columns}")
+        return None
+
+    df = df.dropna(subset=['Close'])
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is None:
+        index = index.tz_localize('UTC')
+    index = index.tz_convert('UTC').tz_localize(None)
+
+    bars = np.empty(len(df), dtype=BAR_DTYPE)
+    bars['ts'] = index.values.astype('datetime64[s]').astype(np.int64)
+    bars['open'] = df['Open'].to_numpy(dtype=np.float64)
+    bars['high'] = df['High'].to_numpy(dtype=np.float64)
+    bars['low'] = df['Low'].to_numpy(dtype=np.float64)
+    bars['close'] = df['Close'].to_numpy(dtype=np.float64)
+    bars['volume'] = df['Volume'].to_numpy(dtype=np.float64) if 'Volume' in df.columns else 1.0
+    return normalize_bars(bars)
+
+
+def bars_to_frame(bars):
+    """Build an OHLCV frame indexed by Datetime (UTC) from a bar array"""
+    index = pd.DatetimeIndex(pd.to_datetime(bars['ts'], unit='s', utc=True), name='Datetime')
+    return pd.DataFrame({
+        'Open': bars['open'],
+        'High': bars['high'],
+        'Low': bars['low'],
+        'Close': bars['close'],
+        'Volume': bars['volume'],
+    }, index=index)
+
+
+def normalize_bars(bars):
+    """Sort bars by timestamp and keep the last record for duplicated timestamps"""
+    if len(bars) < 2:
+        return bars
+    bars = bars[np.argsort(bars['ts'], kind='stable')]
+    keep = np.append(bars['ts'][1:] != bars['ts'][:-1], True)
+    return bars[keep]
+
+
+class BarStore:
+    """Append-only on-disk bar store, one memory-mapped file per symbol and interval.
+
+    Existing records are only ever overwritten in place or replaced by an atomic
+    rename during compaction, so views handed out by read() stay valid.
+    """
+
+    def __init__(self, root=BAR_STORE_DIR, max_bars=BAR_STORE_MAX_BARS):
+        self.root = root
+        self.max_bars = max_bars
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self.appended = 0
+        self.overwritten = 0
+        self.compactions = 0
+
+    def _path(self, symbol, interval):
+        safe_symbol = ''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in symbol)
+        return os.path.join(self.root, f"{safe_symbol}_{interval}.bars")
+
+    def _lock(self, path):
+        with self._locks_guard:
+            return self._locks.setdefault(path, threading.Lock())
+
+    def _map(self, path, mode='r'):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return EMPTY_BARS
+        count = size // BAR_DTYPE.itemsize
+        if count == 0:
+            return EMPTY_BARS
+        return np.memmap(path, dtype=BAR_DTYPE, mode=mode, shape=(count,))
+
+    def read(self, symbol, interval, since=None):
+        """Return stored bars as a read-only view, optionally from epoch `since` onwards"""
+        bars = self._map(self._path(symbol, interval))
+        if since is not None and len(bars):
+            bars = bars[np.searchsorted(bars['ts'], since, side='left'):]
+        return bars
+
+    def last_timestamp(self, symbol, interval):
+        bars = self.read(symbol, interval)
+        return int(bars['ts'][-1]) if len(bars) else None
+
+    def append(self, symbol, interval, bars):
+        """Store new bars. Bars matching stored timestamps overwrite them in place"""
+        bars = normalize_bars(np.asarray(bars, dtype=BAR_DTYPE))
+        if not len(bars):
+            return 0
+
+        path = self._path(symbol, interval)
+        with self._lock(path):
+            os.makedirs(self.root, exist_ok=True)
+            existing = self._map(path)
+            stored = len(existing)
+
+            if stored:
+                last_ts = existing['ts'][-1]
+                revised = bars[bars['ts'] <= last_ts]
+                bars = bars[bars['ts'] > last_ts]
+
+                if len(revised):
+                    positions = np.searchsorted(existing['ts'], revised['ts'])
+                    matched = existing['ts'][positions] == revised['ts']
+                    if matched.any():
+                        writable = self._map(path, mode='r+')
+                        writable[positions[matched]] = revised[matched]
+                        writable.flush()
+                        del writable
+                        self.overwritten += int(matched.sum())
+
+            if len(bars):
+                with open(path, 'ab') as f:
+                    f.write(bars.tobytes())
+                self.appended += len(bars)
+
+            if stored + len(bars) > self.max_bars * 2:
+                self._compact(path)
+
+        return len(bars)
+
+    def _compact(self, path):
+        bars = np.array(self._map(path)[-self.max_bars:])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(bars.tobytes())
+        os.replace(tmp_path, path)
+        self.compactions += 1
+        logger.info(f"Compacted {path} to {len(bars)} bars")
+
+    def stats(self):
+        return {
+            'root': self.root,
+            'appended': self.appended,
+            'overwritten': self.overwritten,
+            'compactions': self.compactions,
+        }
+
+
+# Keep bars from each provider apart so replayed or synthetic data never mixes with live bars
+bar_store = BarStore(root=os.path.join(BAR_STORE_DIR, MARKET_DATA_PROVIDER))
+register_metrics('bar_store', bar_store.stats)
@@ -0,0 +1,290 @@
+"""Benchmarks for the analysis pipeline on fixed synthetic data.
+
+Usage: python benchmarks.py [name ...]   (runs all benchmarks when no name is given)
+"""
+import asyncio
+import logging
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from bar_store import bars_to_frame
+from market_data_providers import SyntheticProvider
+
+# Fixed window so every run sees the same bars
+BENCH_END = datetime(2024, 1, 10, 12, 0, tzinfo=timezone.utc)
+BENCH_SYMBOL = 'EURUSD=X'
+
+
+def bench_frame(days=1, symbol=BENCH_SYMBOL, interval='5m'):
+    bars = SyntheticProvider(seed=7).fetch(symbol, BENCH_END - timedelta(days=days), BENCH_END, interval)
+    return bars_to_frame(bars)
+
+
+def timeit(func, repeat=200):
+    """Average seconds per call over `repeat` calls, after one warm-up call"""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def report(title, baseline, candidate, baseline_name='before', candidate_name='after'):
+    print(f"{title}")
+    print(f"  {baseline_name:<12} {baseline * 1000:9.3f} ms/call")
+    print(f"  {candidate_name:<12} {candidate * 1000:9.3f} ms/call")
+    print(f"  speedup      {baseline / candidate:9.2f}x")
+
+
+def bench_analysis():
+    """Per-timeframe indicator recomputation vs indicators computed once per analysis"""
+    from market_analyzer import MarketAnalyzer, TIMEFRAMES, analysis_frame, timeframe_bars
+
+    analyzer = MarketAnalyzer(BENCH_SYMBOL)
+    df = analysis_frame(bench_frame())
+
+    def per_timeframe():
+        for minutes in TIMEFRAMES:
+            analyzer.analyze_timeframe(df, minutes, bars=timeframe_bars(minutes))
+
+    def shared():
+        analyzer.analyze_timeframes(df)
+
+    report(f"analysis: {len(TIMEFRAMES)} timeframes over {len(df)} rows", timeit(per_timeframe), timeit(shared),
+           'per-timeframe', 'shared')
+
+
+def bench_kernels():
+    """pandas indicator methods vs NumPy kernels on a 35-row close series, with a tolerance check"""
+    import numpy as np
+
+    import indicator_kernels
+    from market_analyzer import MarketAnalyzer
+
+    analyzer = MarketAnalyzer(BENCH_SYMBOL)
+    close = bench_frame()['Close'].tail(35)
+    values = close.to_numpy()
+
+    cases = [
+        ('ema_21', lambda: analyzer.calculate_ema(close, 21), lambda: indicator_kernels.ema(values, 21)),
+        ('sma_20', lambda: close.rolling(window=20).mean(), lambda: indicator_kernels.sma(values, 20)),
+        ('rsi_14', lambda: analyzer.calculate_rsi(close), lambda: indicator_kernels.rsi(values)),
+        ('macd', lambda: analyzer.calculate_macd(close), lambda: indicator_kernels.macd(values)),
+        ('bollinger', lambda: analyzer.calculate_bollinger_bands(close), lambda: indicator_kernels.bollinger_bands(values)),
+    ]
+
+    print(f"kernels: {len(values)}-row series")
+    print(f"  {'indicator':<12} {'pandas ms':>10} {'numpy ms':>10} {'speedup':>8} {'max diff':>10}")
+    for name, pandas_call, numpy_call in cases:
+        expected, actual = pandas_call(), numpy_call()
+        if not isinstance(expected, tuple):
+            expected, actual = (expected,), (actual,)
+        max_diff = 0.0
+        for expected_series, actual_values in zip(expected, actual):
+            expected_values = expected_series.to_numpy()
+            assert np.allclose(expected_values, actual_values, rtol=1e-9, atol=1e-9, equal_nan=True), name
+            both = ~np.isnan(expected_values)
+            if both.any():
+                max_diff = max(max_diff, float(np.abs(expected_values[both] - actual_values[both]).max()))
+
+        pandas_time, numpy_time = timeit(pandas_call, 500), timeit(numpy_call, 500)
+        print(f"  {name:<12} {pandas_time * 1000:10.4f} {numpy_time * 1000:10.4f} "
+              f"{pandas_time / numpy_time:7.1f}x {max_diff:10.2e}")
+
+
+def bench_scanner():
+    """Market overview: one MarketAnalyzer run per pair vs one vectorized scan over all pairs"""
+    from config import CURRENCY_PAIRS
+    from market_analyzer import MarketAnalyzer, TIMEFRAMES, analysis_frame
+    from market_scanner import build_price_matrix, score_matrix
+
+    symbols = list(CURRENCY_PAIRS.values())
+    frames = {symbol: analysis_frame(bench_frame(symbol=symbol)) for symbol in symbols}
+    analyzers = {symbol: MarketAnalyzer(symbol) for symbol in symbols}
+
+    def per_symbol():
+        return {symbol: analyzers[symbol].analyze_timeframes(df)[max(TIMEFRAMES)] for symbol, df in frames.items()}
+
+    def vectorized():
+        matrix_symbols, closes, volumes = build_price_matrix(frames, len(next(iter(frames.values()))))
+        return matrix_symbols, score_matrix(closes, volumes)
+
+    expected = per_symbol()
+    matrix_symbols, scores = vectorized()
+    for i, symbol in enumerate(matrix_symbols):
+        assert scores['signal'][i] == expected[symbol][0], symbol
+        assert abs(scores['confidence'][i] - expected[symbol][2]['confidence']) < 1e-6, symbol
+
+    report(f"scanner: {len(symbols)} pairs", timeit(per_symbol, 20), timeit(vectorized, 20),
+           'per-symbol', 'vectorized')
+
+
+def chart_payload(symbol, bars):
+    """Yahoo v8 chart API payload for the given bars"""
+    return {'chart': {'result': [{
+        'meta': {'symbol': symbol, 'exchangeTimezoneName': 'Europe/London'},
+        'timestamp': bars['ts'].tolist(),
+        'indicators': {'quote': [{
+            'open': bars['open'].tolist(),
+            'high': bars['high'].tolist(),
+            'low': bars['low'].tolist(),
+            'close': bars['close'].tolist(),
+            'volume': bars['volume'].tolist(),
+        }]},
+    }], 'error': None}}
+
+
+def start_chart_stand_in():
+    """Local HTTP stand-in for the chart endpoint serving synthetic bars. Returns (server, url template)"""
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, unquote, urlparse
+
+    provider = SyntheticProvider(seed=7)
+    bodies = {}  # Keep the stand-in cheap so the timings measure the client side
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, like the real endpoint
+        disable_nagle_algorithm = True  # Headers and body go out in separate writes
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            symbol = unquote(url.path.rsplit('/', 1)[-1])
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            key = (symbol, query['period1'], query['period2'], query['interval'])
+            if key not in bodies:
+                start = datetime.fromtimestamp(int(query['period1']), tz=timezone.utc)
+                end = datetime.fromtimestamp(int(query['period2']), tz=timezone.utc)
+                bars = provider.fetch(symbol, start, end, query['interval'])
+                bodies[key] = json.dumps(chart_payload(symbol, bars)).encode()
+            body = bodies[key]
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v8/finance/chart/{{symbol}}"
+
+
+def bench_chart():
+    """yfinance-style fetch (new connection, DataFrame, tz conversion) vs the pooled async chart client"""
+    import numpy as np
+    import pandas as pd
+    import requests
+
+    from bar_store import frame_to_bars
+    from config import CURRENCY_PAIRS
+    from yahoo_chart import YahooChartClient
+
+    server, url = start_chart_stand_in()
+    client = YahooChartClient(base_url=url)
+    symbols = list(CURRENCY_PAIRS.values())[:10]
+    start, end = BENCH_END - timedelta(days=1), BENCH_END
+    params = {'period1': int(start.timestamp()), 'period2': int(end.timestamp()), 'interval': '5m', 'includePrePost': 'true'}
+
+    def dataframe_path():
+        results = {}
+        for symbol in symbols:
+            payload = requests.get(url.format(symbol=symbol), params=params, timeout=10).json()
+            result = payload['chart']['result'][0]
+            index = pd.to_datetime(result['timestamp'], unit='s', utc=True).tz_convert(result['meta']['exchangeTimezoneName'])
+            quote = result['indicators']['quote'][0]
+            df = pd.DataFrame({
+                'Open': quote['open'], 'High': quote['high'], 'Low': quote['low'],
+                'Close': quote['close'], 'Volume': quote['volume'],
+            }, index=index)
+            results[symbol] = frame_to_bars(df)
+        return results
+
+    def pooled_client():
+        return client.fetch_many(symbols, start, end, '5m')
+
+    expected, actual = dataframe_path(), pooled_client()
+    for symbol in symbols:
+        assert np.array_equal(expected[symbol], actual[symbol]), symbol
+
+    report(f"chart fetch: {len(symbols)} symbols x {len(actual[symbols[0]])} bars from a local stand-in",
+           timeit(dataframe_path, 20), timeit(pooled_client, 20), 'dataframe', 'async pool')
+    client.close()
+    server.shutdown()
+
+
+def bench_render():
+    """Chart rendering: one-off Figure per chart vs the pre-styled template, plus a concurrent isolation check"""
+    from chart_engine import render_chart
+    from chart_service import chart_service
+    from generate_sample import render_figure_chart
+    from market_analyzer import interpolate_minutes
+
+    frames = [interpolate_minutes(bench_frame(symbol=symbol), 30) for symbol in ('EURUSD=X', 'BTC-USD', 'USDJPY=X', 'ETH-USD')]
+    expected = [render_chart(df) for df in frames]
+    assert len(set(expected)) == len(frames), "distinct inputs rendered identical charts"
+
+    # Concurrent renders through the production path: the chart service's worker pool
+    async def render_all():
+        return await asyncio.gather(*(chart_service.render(df) for df in frames))
+
+    chart_service.warm_up()
+    for _ in range(3):
+        rendered = asyncio.run(render_all())
+        assert rendered == expected, "concurrent renders leaked into each other"
+    chart_service.shutdown()
+
+    figure_time = timeit(lambda: render_figure_chart(frames[0]), 10)
+    template_time = timeit(lambda: render_chart(frames[0]), 20)
+    report(f"render: {len(frames)} concurrent charts isolated", figure_time, template_time, 'figure', 'template')
+    print(f"  charts/sec   {1 / figure_time:9.1f} -> {1 / template_time:.1f}")
+
+
+def bench_raster():
+    """Chart engines: matplotlib template vs the NumPy/PIL raster renderer"""
+    import io
+
+    from PIL import Image
+
+    from chart_engine import chart_arrays, render_arrays
+    from market_analyzer import interpolate_minutes
+    from raster_chart import render_raster
+
+    arrays = chart_arrays(interpolate_minutes(bench_frame(), 30))
+    with Image.open(io.BytesIO(render_raster(*arrays))) as image:
+        assert image.size == (1200, 800), f"raster chart is {image.size}, expected 1200x800"
+
+    template_time = timeit(lambda: render_arrays(*arrays), 20)
+    raster_time = timeit(lambda: render_raster(*arrays), 100)
+    report("raster: 30-minute analysis chart", template_time, raster_time, 'matplotlib', 'raster')
+    print(f"  charts/sec   {1 / template_time:9.1f} -> {1 / raster_time:.1f}")
+
+
+BENCHMARKS = {
+    'analysis': bench_analysis,
+    'kernels': bench_kernels,
+    'scanner': bench_scanner,
+    'chart': bench_chart,
+    'render': bench_render,
+    'raster': bench_raster,
+}
+
+
+def main(names):
+    # The analysis path logs every step; keep it out of the timings
+    logging.disable(logging.ERROR)
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name}. Available: {', '.join(BENCHMARKS)}")
+            return 1
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import hashlib
 import time
@@ -5,17 +6,11 @@ import os
 import sys
 import random
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters, ConversationHandler
 from config import *
-from market_analyzer import MarketAnalyzer
+from market_analyzer import MarketAnalyzer, interpolate_minutes
 from utils import get_currency_keyboard, get_language_keyboard, format_signal_message
-try:
-    from generate_sample import create_analysis_image
-except ImportError:
-    logging.error("Could not import generate_sample module. Chart generation will be disabled.")
-    def create_analysis_image(*args, **kwargs):
-        logging.warning("Chart generation is disabled due to missing module")
-        return False
 from datetime import datetime, timedelta
 import json
 import platform
@@ -25,9 +20,17 @@ from models import (
     get_all_users, get_pending_users, delete_user, set_user_admin_status, set_user_moderator_status,
     create_admin_user, get_approved_user_ids, ADMIN_USERNAME, ADMIN_PASSWORD_HASH,
     get_user_activity_stats, get_bot_settings, update_bot_setting, 
-    export_bot_data, import_bot_data, get_moderator_permissions, update_moderator_permission
+    export_bot_data, import_bot_data, get_moderator_permissions, update_moderator_permission,
+    setup_database
 )
 from keep_alive import keep_alive
+from market_prefetcher import start_prefetcher
+from market_scanner import scan_market, format_market_overview
+from symbol_health import symbol_health
+from chart_service import (
+    chart_service, chart_variant, get_chart_renderer, set_chart_renderer, CHART_WINDOW_MINUTES
+)
+from market_cache import chart_cache
 
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -51,6 +54,14 @@ ADMIN_USER_ANALYTICS, ADMIN_SIGNAL_MANAGEMENT = range(18, 20)
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
+def format_currency_line(pair):
+    """Строка списка валютных пар с пометкой о проблемах с данными"""
+    line = f"- {pair['display_name']} ({pair['pair_code']}): {'🟢 Активна' if pair['is_active'] else '🔴 Неактивна'}"
+    if symbol_health.is_flagged(pair['symbol']):
+        status = symbol_health.status(pair['symbol'])
+        line += f" ⚠️ Нет данных ({status['consecutive_failures']} ошибок подряд)"
+    return line
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     try:
         user = update.effective_user
@@ -344,6 +355,42 @@ async def handle_language_selection(update: Update, context: ContextTypes.DEFAUL
         logger.error(f"Language selection error: {str(e)}")
         await query.answer("❌ Error processing language change")
 
+async def send_chart(message, chart_key, market_data, **kwargs):
+    """Reply with the chart for chart_key, reusing the Telegram file_id of an earlier upload"""
+    cached = chart_cache.get(chart_key)
+    if cached and cached['file_id']:
+        try:
+            return await message.reply_photo(photo=cached['file_id'], **kwargs)
+        except BadRequest as e:
+            logger.warning(f"Cached chart file_id rejected, uploading again: {e}")
+            cached = None
+
+    png = cached['png'] if cached else None
+    if png is None:
+        # Rendered in a worker process; None (busy, slow or failed) falls back to text only
+        png = await chart_service.render(interpolate_minutes(market_data, CHART_WINDOW_MINUTES))
+        if png is None:
+            raise RuntimeError("Chart rendering unavailable")
+        chart_cache.set(chart_key, {'png': png, 'file_id': None})
+
+    sent = await message.reply_photo(photo=png, **kwargs)
+    if sent.photo:
+        # Telegram keeps the upload; later views resend it by id instead of the bytes
+        chart_cache.set(chart_key, {'png': None, 'file_id': sent.photo[-1].file_id})
+    return sent
+
+CHART_RENDERER_LABELS = {'matplotlib': "Matplotlib", 'raster': "Быстрый (NumPy/PIL)"}
+
+def load_chart_renderer():
+    """Apply the chart engine saved in bot settings"""
+    setting = get_bot_settings().get('chart_renderer')
+    if setting:
+        set_chart_renderer(setting['value'])
+
+def chart_renderer_button():
+    label = CHART_RENDERER_LABELS[get_chart_renderer()]
+    return InlineKeyboardButton(f"🖼 Движок графиков: {label}", callback_data="admin_setting_chart_renderer")
+
 async def button_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
@@ -580,49 +627,62 @@ async def button_click(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await query.message.reply_text(MESSAGES[lang_code]['ERRORS']['GENERAL_ERROR'])
             return
 
-        analyzing_message = await query.message.reply_text(
-            MESSAGES[lang_code]['ANALYZING'],
-            parse_mode='MarkdownV2'
-        )
+        analyzer = MarketAnalyzer(symbol)
+        analyzer.set_language(lang_code)
+
+        # Results are shared across users per bar; on a cache hit reply right away
+        analysis_result = analyzer.peek_cached_analysis()
+        analyzing_message = None
+        if analysis_result is None:
+            analyzing_message = await query.message.reply_text(
+                MESSAGES[lang_code]['ANALYZING'],
+                parse_mode='MarkdownV2'
+            )
+
+        async def show_text(text, **kwargs):
+            if analyzing_message:
+                await analyzing_message.edit_text(text, **kwargs)
+            else:
+                await query.message.reply_text(text, **kwargs)
 
         try:
-            analyzer = MarketAnalyzer(symbol)
-            analyzer.set_language(lang_code)
-            analysis_result = analyzer.analyze_market()
+            if analysis_result is None:
+                analysis_result = await analyzer.analyze_market_async(allow_stale=True)
 
             if not analysis_result or 'error' in analysis_result:
                 error_msg = analysis_result.get('error', MESSAGES[lang_code]['ERRORS']['ANALYSIS_ERROR'])
-                await analyzing_message.edit_text(error_msg, parse_mode='MarkdownV2')
+                await show_text(error_msg, parse_mode='MarkdownV2')
                 return
 
-            market_data, error_message = analyzer.get_market_data(minutes=30)
-            if error_message or market_data is None or market_data.empty:
-                await analyzing_message.edit_text(MESSAGES[lang_code]['ERRORS']['NO_DATA'])
+            market_data = analysis_result.get('market_data')
+            if market_data is None or market_data.empty:
+                await show_text(MESSAGES[lang_code]['ERRORS']['NO_DATA'])
                 return
 
             result_message = format_signal_message(pair, analysis_result, lang_code)
 
             try:
-                create_analysis_image(analysis_result, market_data, lang_code)
-                with open('analysis_sample.png', 'rb') as photo:
-                    await query.message.reply_photo(
-                        photo=photo,
-                        caption=result_message,
-                        parse_mode='MarkdownV2',
-                        reply_markup=get_currency_keyboard(current_lang=lang_code, user_data=user_data)
-                    )
-                await analyzing_message.delete()
+                await send_chart(
+                    query.message,
+                    (symbol, analysis_result['last_bar'], chart_variant()),
+                    market_data,
+                    caption=result_message,
+                    parse_mode='MarkdownV2',
+                    reply_markup=get_currency_keyboard(current_lang=lang_code, user_data=user_data)
+                )
+                if analyzing_message:
+                    await analyzing_message.delete()
             except Exception as img_error:
                 logger.error(f"Chart error: {str(img_error)}")
-                await analyzing_message.edit_text(
-                    text=result_message,
+                await show_text(
+                    result_message,
                     parse_mode='MarkdownV2',
                     reply_markup=get_currency_keyboard(current_lang=lang_code, user_data=user_data)
                 )
 
         except Exception as e:
             logger.error(f"Analysis error: {str(e)}")
-            await analyzing_message.edit_text(MESSAGES[lang_code]['ERRORS']['ANALYSIS_ERROR'])
+            await show_text(MESSAGES[lang_code]['ERRORS']['ANALYSIS_ERROR'])
 
     except Exception as e:
         logger.error(f"Button click error: {str(e)}")
@@ -892,10 +952,7 @@ async def admin_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         from models import get_all_currency_pairs
         currency_pairs = get_all_currency_pairs()
         
-        currency_list = "\n".join([
-            f"- {pair['display_name']} ({pair['pair_code']}): {'🟢 Активна' if pair['is_active'] else '🔴 Неактивна'}"
-            for pair in currency_pairs
-        ])
+        currency_list = "\n".join([format_currency_line(pair) for pair in currency_pairs])
         
         if not currency_list:
             currency_list = "Нет добавленных валютных пар"
@@ -999,6 +1056,7 @@ async def admin_menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
         )
         
         settings_keyboard = [
+            [chart_renderer_button()],
             [InlineKeyboardButton("↩️ Назад", callback_data="admin_back")]
         ]
         
@@ -1509,10 +1567,17 @@ def main():
     error_count = 0
     last_error_time = None
 
+    # Database setup runs here rather than at import: spawned chart workers import this module
+    setup_database()
+    load_chart_renderer()
+    # Start the chart workers ahead of the first request
+    chart_service.warm_up()
+
     while True:  # Infinite loop for continuous operation
         try:
             # Start the keep-alive server
             keep_alive()
+            start_prefetcher()
             logger.info("Starting bot...")
 
             application = Application.builder().token(BOT_TOKEN).build()
@@ -1591,6 +1656,9 @@ def main():
                             success = update_currency_pair_status(pair_code, new_status)
                             
                             if success:
+                                if new_status:
+                                    # Повторно включённая пара снова запрашивается у провайдера
+                                    symbol_health.reset(current_pair['symbol'])
                                 status_text = "активирована" if new_status else "деактивирована"
                                 await query.edit_message_text(
                                     f"✅ Валютная пара {current_pair['display_name']} успешно {status_text}!",
@@ -1619,10 +1687,7 @@ def main():
                         from models import get_all_currency_pairs
                         currency_pairs = get_all_currency_pairs()
                         
-                        currency_list = "\n".join([
-                            f"- {pair['display_name']} ({pair['pair_code']}): {'🟢 Активна' if pair['is_active'] else '🔴 Неактивна'}"
-                            for pair in currency_pairs
-                        ])
+                        currency_list = "\n".join([format_currency_line(pair) for pair in currency_pairs])
                         
                         if not currency_list:
                             currency_list = "Нет добавленных валютных пар"
@@ -1636,8 +1701,9 @@ def main():
                         # Добавляем кнопки для каждой валютной пары
                         for pair in currency_pairs:
                             toggle_text = "🔴 Деактивировать" if pair['is_active'] else "🟢 Активировать"
+                            warning = "⚠️ " if symbol_health.is_flagged(pair['symbol']) else ""
                             currency_keyboard.insert(-1, [
-                                InlineKeyboardButton(f"{pair['display_name']} - {toggle_text}", 
+                                InlineKeyboardButton(f"{warning}{pair['display_name']} - {toggle_text}", 
                                                     callback_data=f"currency_toggle_{pair['pair_code']}")
                             ])
                         
@@ -2155,8 +2221,16 @@ def main():
                     )
                     return ADMIN_MENU
                 
+                if action == "admin_setting_chart_renderer":
+                    # Переключение движка графиков; новые графики кешируются отдельно
+                    new_renderer = 'raster' if get_chart_renderer() == 'matplotlib' else 'matplotlib'
+                    set_chart_renderer(new_renderer)
+                    if not update_bot_setting('chart_renderer', new_renderer):
+                        logger.warning("Chart renderer setting was not saved, it resets on restart")
+                
                 # Настройки бота
                 settings_keyboard = [
+                    [chart_renderer_button()],
                     [InlineKeyboardButton("⏱️ Частота обновления данных", callback_data="admin_setting_update_freq")],
                     [InlineKeyboardButton("🔔 Настройки уведомлений", callback_data="admin_setting_notifications")],
                     [InlineKeyboardButton("🌐 Региональные настройки", callback_data="admin_setting_regional")],
@@ -2519,6 +2593,18 @@ def main():
                     )
                     return ADMIN_MENU
                 
+                if query.data == "admin_market_overview":
+                    # Один векторизованный проход по всем кэшированным парам
+                    overview = await asyncio.to_thread(scan_market)
+                    await query.edit_message_text(
+                        format_market_overview(overview),
+                        reply_markup=InlineKeyboardMarkup([
+                            [InlineKeyboardButton("🔄 Обновить", callback_data="admin_market_overview")],
+                            [InlineKeyboardButton("↩️ Назад", callback_data="admin_signals")]
+                        ])
+                    )
+                    return ADMIN_SIGNAL_MANAGEMENT
+                
                 signals_text = "📊 *Управление сигналами*\n\n"
                 signals_text += "Здесь вы можете настроить параметры торговых сигналов и уведомлений.\n\n"
                 
@@ -2758,7 +2844,10 @@ def main():
                 entry_points=[CommandHandler("admin", admin_command)],
                 states={
                     ADMIN_PASSWORD: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin_check_password)],
-                    ADMIN_MENU: [CallbackQueryHandler(admin_menu_handler)],
+                    ADMIN_MENU: [
+                        CallbackQueryHandler(admin_signals, pattern="^admin_signals$"),
+                        CallbackQueryHandler(admin_menu_handler)
+                    ],
                     ADMIN_USER_MANAGEMENT: [CallbackQueryHandler(admin_user_management)],
                     ADMIN_BROADCAST_MESSAGE: [
                         MessageHandler(filters.TEXT & ~filters.COMMAND, admin_broadcast_message),
@@ -0,0 +1,117 @@
+import io
+import threading
+
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+
+from indicator_kernels import ema
+
+BACKGROUND = '#1a1b26'
+PANEL = '#24283b'
+GRID = '#414868'
+PRICE_COLOR = 'white'
+EMA_FAST_COLOR = '#00ff00'
+EMA_SLOW_COLOR = '#ff6b6b'
+VOLUME_COLOR = '#4a9eff'
+
+
+def chart_arrays(market_data):
+    """Compact arrays a chart is drawn from: x (matplotlib date numbers), close, volume"""
+    x = mdates.date2num(market_data.index.to_pydatetime())
+    return x, market_data['Close'].to_numpy(dtype=np.float64), market_data['Volume'].to_numpy(dtype=np.float64)
+
+
+class ChartTemplate:
+    """Pre-styled analysis chart. The Figure, axes, legend and layout are built once;
+    render() only swaps the line and volume data and redraws the Agg canvas.
+    """
+
+    def __init__(self, figsize=(12, 8), dpi=100):
+        self.dpi = dpi
+        self.figure = Figure(figsize=figsize, dpi=dpi, facecolor=BACKGROUND)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.price_ax, self.volume_ax = self.figure.subplots(2, 1, height_ratios=[3, 1])
+
+        self.price_line, = self.price_ax.plot([], [], label='Price', color=PRICE_COLOR, linewidth=2)
+        self.ema_fast_line, = self.price_ax.plot([], [], label='EMA 7', color=EMA_FAST_COLOR, alpha=0.7)
+        self.ema_slow_line, = self.price_ax.plot([], [], label='EMA 21', color=EMA_SLOW_COLOR, alpha=0.7)
+        self.volume_bars = PolyCollection([], facecolors=VOLUME_COLOR, alpha=0.3)
+        self.volume_ax.add_collection(self.volume_bars)
+
+        self.price_ax.set_title('Price Analysis', color='white', pad=20)
+        self.price_ax.legend(facecolor=PANEL, edgecolor=GRID, labelcolor='white')
+        self.volume_ax.set_title('Volume', color='white', pad=10)
+        for ax in (self.price_ax, self.volume_ax):
+            ax.set_facecolor(PANEL)
+            ax.grid(True, color=GRID, linestyle='--', alpha=0.3)
+            ax.tick_params(colors='white')
+            ax.xaxis_date()
+            ax.xaxis.set_major_locator(mdates.AutoDateLocator())
+            ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+            ax.spines['top'].set_visible(False)
+            ax.spines['right'].set_visible(False)
+            ax.spines['bottom'].set_color(GRID)
+            ax.spines['left'].set_color(GRID)
+
+        # Lay out once against representative data; tick labels stay the same width
+        self._set_data(np.arange(30) / 1440.0 + 19000.0, np.linspace(1.0, 100000.0, 30), np.ones(30))
+        self.figure.tight_layout()
+
+    def _set_data(self, x, close, volume):
+        self.price_line.set_data(x, close)
+        self.ema_fast_line.set_data(x, ema(close, 7))
+        self.ema_slow_line.set_data(x, ema(close, 21))
+
+        width = 0.8 * (np.median(np.diff(x)) if len(x) > 1 else 1 / 1440.0)
+        left, right = x - width / 2, x + width / 2
+        bottom = np.zeros_like(volume)
+        # One rectangle per bar: (left, 0) (left, v) (right, v) (right, 0)
+        verts = np.stack([
+            np.column_stack([left, bottom]),
+            np.column_stack([left, volume]),
+            np.column_stack([right, volume]),
+            np.column_stack([right, bottom]),
+        ], axis=1)
+        self.volume_bars.set_verts(verts)
+
+        x_min, x_max = x.min() - width, x.max() + width
+        low, high = min(close.min(), self.ema_fast_line.get_ydata().min(), self.ema_slow_line.get_ydata().min()), \
+            max(close.max(), self.ema_fast_line.get_ydata().max(), self.ema_slow_line.get_ydata().max())
+        pad = (high - low) * 0.05 or abs(high) * 0.001 or 1.0
+        self.price_ax.set_xlim(x_min, x_max)
+        self.price_ax.set_ylim(low - pad, high + pad)
+        self.volume_ax.set_xlim(x_min, x_max)
+        self.volume_ax.set_ylim(0, (volume.max() if len(volume) else 1.0) * 1.05 or 1.0)
+
+    def render(self, x, close, volume):
+        """Draw the given series and return the PNG bytes"""
+        self._set_data(np.asarray(x, dtype=np.float64), np.asarray(close, dtype=np.float64),
+                       np.asarray(volume, dtype=np.float64))
+        buffer = io.BytesIO()
+        # Telegram recompresses photos anyway; fast zlib keeps encoding off the critical path
+        self.canvas.print_png(buffer, pil_kwargs={'compress_level': 1})
+        return buffer.getvalue()
+
+
+_local = threading.local()
+
+
+def get_template():
+    """Chart template of the current worker thread, built on first use"""
+    template = getattr(_local, 'template', None)
+    if template is None:
+        template = _local.template = ChartTemplate()
+    return template
+
+
+def render_arrays(x, close, volume):
+    """Render compact chart arrays to PNG bytes with this worker's template"""
+    return get_template().render(x, close, volume)
+
+
+def render_chart(market_data):
+    """Render a market data frame (Close and Volume columns, DatetimeIndex) to PNG bytes"""
+    return get_template().render(*chart_arrays(market_data))
@@ -0,0 +1,180 @@
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from chart_engine import chart_arrays, render_arrays
+from raster_chart import render_raster
+from config import CHART_POOL_SIZE, CHART_QUEUE_LIMIT, CHART_RENDER_TIMEOUT
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+CHART_WINDOW_MINUTES = 30  # Minutes of 1-minute data shown on the analysis chart
+
+# Chart engines admins can pick from; matplotlib stays the default
+CHART_RENDERERS = {
+    'matplotlib': render_arrays,
+    'raster': render_raster,
+}
+DEFAULT_CHART_RENDERER = 'matplotlib'
+_renderer = DEFAULT_CHART_RENDERER
+
+
+def get_chart_renderer():
+    return _renderer
+
+
+def set_chart_renderer(name):
+    """Switch the chart engine; unknown names are ignored"""
+    global _renderer
+    if name not in CHART_RENDERERS:
+        logger.warning(f"Unknown chart renderer {name!r}, keeping {_renderer}")
+        return False
+    if name != _renderer:
+        logger.info(f"Chart renderer switched from {_renderer} to {name}")
+    _renderer = name
+    return True
+
+
+def render_with(renderer, x, close, volume):
+    """Worker entry point: PNG bytes from the named chart engine"""
+    return CHART_RENDERERS[renderer](x, close, volume)
+
+
+def chart_variant():
+    """Identifies how a chart is drawn, part of the chart cache key"""
+    return f"{_renderer}:{CHART_WINDOW_MINUTES}m"
+
+
+class ChartRenderService:
+    """Renders charts in worker processes so matplotlib never blocks the event loop.
+
+    At most pool_size renders run and queue_limit wait; further requests are refused
+    straight away, and renders slower than timeout are abandoned. In both cases the
+    caller gets None and replies without a chart.
+    """
+
+    def __init__(self, pool_size=CHART_POOL_SIZE, queue_limit=CHART_QUEUE_LIMIT, timeout=CHART_RENDER_TIMEOUT):
+        self.pool_size = pool_size
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.rendered = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.total_render_time = 0.0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn rather than fork: the pool may be rebuilt while the prefetcher,
+                # Flask and asyncio worker threads run, and forking then can deadlock the child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.pool_size, mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def _reserve(self):
+        with self._lock:
+            if self.pending >= self.pool_size + self.queue_limit:
+                self.rejected += 1
+                return False
+            self.pending += 1
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.pending -= 1
+
+    def _reset_executor(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def render_arrays(self, x, close, volume):
+        """PNG bytes for the given arrays, or None when busy, too slow or failing"""
+        if not self._reserve():
+            logger.warning("Chart queue is full, replying without a chart")
+            return None
+
+        executor = self._get_executor()
+        started = time.monotonic()
+        try:
+            future = executor.submit(render_with, _renderer, x, close, volume)
+        except Exception as e:
+            self._release()
+            self.failures += 1
+            logger.error(f"Could not submit chart render: {e}")
+            self._reset_executor(executor)
+            return None
+        # The slot is held until the worker is really done, even if we stop waiting
+        future.add_done_callback(self._release)
+
+        try:
+            png = await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Chart render exceeded {self.timeout}s, replying without a chart")
+            return None
+        except BrokenProcessPool as e:
+            self.failures += 1
+            logger.error(f"Chart worker pool broke: {e}")
+            self._reset_executor(executor)
+            return None
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Chart render failed: {e}")
+            return None
+
+        self.rendered += 1
+        self.total_render_time += time.monotonic() - started
+        return png
+
+    async def render(self, market_data):
+        """PNG bytes for a market data frame, or None to fall back to a text-only reply"""
+        return await self.render_arrays(*chart_arrays(market_data))
+
+    def warm_up(self):
+        """Start the workers and build their chart templates ahead of the first request"""
+        executor = self._get_executor()
+        x = np.arange(30) / 1440.0 + 19000.0
+        for _ in range(self.pool_size):
+            executor.submit(render_with, _renderer, x, np.ones(30), np.ones(30))
+        logger.info(f"Chart render pool started with {self.pool_size} workers")
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'renderer': _renderer,
+                'pool_size': self.pool_size,
+                'queue_limit': self.queue_limit,
+                'pending': self.pending,
+                'queued': max(0, self.pending - self.pool_size),
+                'rendered': self.rendered,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'failures': self.failures,
+                'avg_render': round(self.total_render_time / self.rendered, 4) if self.rendered else 0.0,
+            }
+
+
+chart_service = ChartRenderService()
+register_metrics('chart_service', chart_service.stats)
+atexit.register(chart_service.shutdown)
@@ -58,6 +58,56 @@ CURRENCY_PAIRS = {
     '🇿🇦 USD/ZAR': 'USDZAR=X'
 }
 
+# Market data settings
+MARKET_DATA_INTERVAL = '5m'  # Bar size requested from the data provider
+ANALYSIS_BAR_MODE = os.environ.get('ANALYSIS_BAR_MODE', 'native')  # native bars or legacy 1-minute 'interpolated'
+INDICATOR_BACKEND = os.environ.get('INDICATOR_BACKEND', 'numpy')  # numpy kernels or pandas
+MARKET_DATA_PROVIDER = os.environ.get('MARKET_DATA_PROVIDER', 'yfinance')  # yfinance, yahoo_chart, replay or synthetic
+MARKET_DATA_REPLAY_DIR = os.environ.get('MARKET_DATA_REPLAY_DIR', os.path.join('data', 'replay'))
+MARKET_DATA_SYNTHETIC_SEED = int(os.environ.get('MARKET_DATA_SYNTHETIC_SEED', 42))
+YAHOO_CHART_URL = os.environ.get('YAHOO_CHART_URL', 'https://query1.finance.yahoo.com/v8/finance/chart/{symbol}')
+YAHOO_CHART_POOL_SIZE = int(os.environ.get('YAHOO_CHART_POOL_SIZE', 8))  # Keep-alive connections to the chart API
+YAHOO_CHART_TIMEOUT = float(os.environ.get('YAHOO_CHART_TIMEOUT', 10))
+YAHOO_CHART_KEEPALIVE = float(os.environ.get('YAHOO_CHART_KEEPALIVE', 60))  # Seconds an idle connection is kept open
+HTTP_POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', 10))  # Hosts with a kept-alive connection pool
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', 4))  # Connections per host
+HTTP_DNS_TTL = int(os.environ.get('HTTP_DNS_TTL', 300))  # Seconds a resolved address is reused
+MARKET_DATA_CACHE_SIZE = int(os.environ.get('MARKET_DATA_CACHE_SIZE', 128))
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', 256))
+CHART_CACHE_SIZE = int(os.environ.get('CHART_CACHE_SIZE', 128))  # Rendered charts and their Telegram file_ids
+MARKET_DATA_CACHE_GRACE = int(os.environ.get('MARKET_DATA_CACHE_GRACE', 10))  # Seconds after bar close before refetching
+BAR_STORE_DIR = os.environ.get('BAR_STORE_DIR', os.path.join('data', 'bars'))
+BAR_STORE_MAX_BARS = int(os.environ.get('BAR_STORE_MAX_BARS', 2016))  # One week of 5m bars per symbol
+PREFETCH_ENABLED = os.environ.get('PREFETCH_ENABLED', '1') == '1'
+PREFETCH_DELAY = int(os.environ.get('PREFETCH_DELAY', 5))  # Seconds after bar close before the bulk download
+UPSTREAM_MAX_CONCURRENCY = int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 4))  # Simultaneous provider requests
+UPSTREAM_RATE = float(os.environ.get('UPSTREAM_RATE', 2.0))  # Provider requests per second, sustained
+UPSTREAM_BURST = int(os.environ.get('UPSTREAM_BURST', 5))  # Provider requests allowed in a burst
+UPSTREAM_QUEUE_TIMEOUT = float(os.environ.get('UPSTREAM_QUEUE_TIMEOUT', 30))  # Seconds to wait for a slot before giving up
+FETCH_MAX_ATTEMPTS = int(os.environ.get('FETCH_MAX_ATTEMPTS', 3))
+FETCH_DEADLINE = float(os.environ.get('FETCH_DEADLINE', 12))  # Total seconds allowed for one market data request
+RETRY_BASE_DELAY = float(os.environ.get('RETRY_BASE_DELAY', 0.5))  # Backoff cap doubles per attempt from here
+RETRY_MAX_DELAY = float(os.environ.get('RETRY_MAX_DELAY', 4))
+HEDGE_ENABLED = os.environ.get('HEDGE_ENABLED', '1') == '1'  # Fire a second fetch when the first is slower than p95
+HEDGE_DEFAULT_DELAY = float(os.environ.get('HEDGE_DEFAULT_DELAY', 3))  # Used until enough latencies are observed
+HEDGE_MIN_DELAY = float(os.environ.get('HEDGE_MIN_DELAY', 0.5))
+CHART_POOL_SIZE = int(os.environ.get('CHART_POOL_SIZE', 2))  # Chart rendering worker processes
+CHART_QUEUE_LIMIT = int(os.environ.get('CHART_QUEUE_LIMIT', 8))  # Renders allowed to wait for a worker
+CHART_RENDER_TIMEOUT = float(os.environ.get('CHART_RENDER_TIMEOUT', 10))  # Seconds before replying without a chart
+# Longest an analysis may be served stale (while refreshing in the background), seconds per asset class
+MAX_STALENESS = {
+    'crypto': int(os.environ.get('MAX_STALENESS_CRYPTO', 60)),
+    'fx': int(os.environ.get('MAX_STALENESS_FX', 300)),
+    'exotic': int(os.environ.get('MAX_STALENESS_EXOTIC', 600)),
+}
+MAX_STALENESS_WEEKEND = {  # Overrides for Saturday/Sunday, when FX quotes do not move
+    'fx': int(os.environ.get('MAX_STALENESS_FX_WEEKEND', 3 * 24 * 3600)),
+    'exotic': int(os.environ.get('MAX_STALENESS_EXOTIC_WEEKEND', 3 * 24 * 3600)),
+}
+SYMBOL_FAILURE_COOLDOWN = int(os.environ.get('SYMBOL_FAILURE_COOLDOWN', 300))  # Seconds to serve a cached NO_DATA/TIMEOUT
+SYMBOL_FLAG_AFTER = int(os.environ.get('SYMBOL_FLAG_AFTER', 3))  # Consecutive failures before a symbol is flagged
+SYMBOL_FLAGGED_COOLDOWN = int(os.environ.get('SYMBOL_FLAGGED_COOLDOWN', 3600))  # Cooldown once a symbol is flagged
+
 MESSAGES = {
     'tg': {
         'WELCOME': """🌟 *Хуш омадед ба боти пешрафтаи таҳлили бозори молиявӣ\!*
@@ -86,6 +136,7 @@ MESSAGES = {
         'CURRENT_PRICE': "Нарх",
         'EXPIRATION': "Вақти амал",
         'CONFIDENCE': "Боварӣ",
+        'DATA_AGE': "Маълумот аз {} пеш",
         'MINUTES': "дақиқа",
         'TIMEFRAME': "Сигнал дар {} мин",
         'SIGNALS': {
@@ -133,6 +184,7 @@ MESSAGES = {
         'CURRENT_PRICE': "Цена",
         'EXPIRATION': "Время экспирации",
         'CONFIDENCE': "Уверенность",
+        'DATA_AGE': "Данные {} назад",
         'MINUTES': "минут",
         'TIMEFRAME': "Сигнал на {} минут",
         'SIGNALS': {
@@ -179,6 +231,7 @@ MESSAGES = {
         'CURRENT_PRICE': "Narx",
         'EXPIRATION': "Amal vaqti",
         'CONFIDENCE': "Ishonch",
+        'DATA_AGE': "Ma'lumotlar {} oldin",
         'MINUTES': "daqiqa",
         'TIMEFRAME': "Signal {} daqiqada",
         'SIGNALS': {
@@ -225,6 +278,7 @@ MESSAGES = {
         'CURRENT_PRICE': "Баға",
         'EXPIRATION': "Әрекет уақыты",
         'CONFIDENCE': "Сенімділік",
+        'DATA_AGE': "Деректер {} бұрын",
         'MINUTES': "минут",
         'TIMEFRAME': "Сигнал {} минутта",
         'SIGNALS': {
@@ -271,6 +325,7 @@ MESSAGES = {
         'CURRENT_PRICE': "Price",
         'EXPIRATION': "Expiration time",
         'CONFIDENCE': "Confidence",
+        'DATA_AGE': "Data from {} ago",
         'MINUTES': "minutes",
         'TIMEFRAME': "Signal for {} min",
         'SIGNALS': {
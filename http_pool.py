@@ -0,0 +1,147 @@
+import ipaddress
+import logging
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from config import HTTP_POOL_HOSTS, HTTP_POOL_MAXSIZE, HTTP_DNS_TTL
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DNSCache:
+    """Resolved addresses per host, reused for `ttl` seconds"""
+
+    def __init__(self, ttl=HTTP_DNS_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, host, port):
+        """Address to connect to for host. Falls back to host itself so urllib3 reports lookup errors"""
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        try:
+            address = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)[0][4][0]
+        except OSError as e:
+            if entry:
+                logger.warning(f"DNS lookup for {host} failed, reusing cached address: {e}")
+                return entry[0]
+            return host
+
+        with self._lock:
+            self._entries[host] = (address, now + self.ttl)
+        return address
+
+    def stats(self):
+        with self._lock:
+            return {'hosts': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+dns_cache = DNSCache()
+
+
+class _CachedDNSMixin:
+    """Connects to the cached address; TLS SNI and certificate checks still use the hostname"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        self._dns_host = dns_cache.resolve(host, self.port)
+        try:
+            return super()._new_conn()
+        finally:
+            self._dns_host = host
+
+
+class CachedDNSHTTPConnection(_CachedDNSMixin, HTTPConnection):
+    pass
+
+
+class CachedDNSHTTPSConnection(_CachedDNSMixin, HTTPSConnection):
+    pass
+
+
+class CachedDNSHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CachedDNSHTTPConnection
+
+
+class CachedDNSHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CachedDNSHTTPSConnection
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter with per-host connection limits and DNS caching"""
+
+    def __init__(self, pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE):
+        # pool_block caps every host at pool_maxsize open connections
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CachedDNSHTTPConnectionPool,
+            'https': CachedDNSHTTPSConnectionPool,
+        }
+
+    def pool_stats(self):
+        """Connection reuse per host: connections opened vs requests sent"""
+        pools = self.poolmanager.pools
+        hosts = {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                'connections': pool.num_connections,
+                'requests': pool.num_requests,
+            }
+        return hosts
+
+
+def create_session():
+    session = requests.Session()
+    adapter = PooledHTTPAdapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Shared keep-alive session for plain HTTP calls (Telegram health checks and the like)
+http_session = create_session()
+
+
+def http_stats():
+    adapter = http_session.get_adapter('https://')
+    hosts = adapter.pool_stats()
+    connections = sum(host['connections'] for host in hosts.values())
+    requests_sent = sum(host['requests'] for host in hosts.values())
+    return {
+        'hosts': hosts,
+        'connections': connections,
+        'requests': requests_sent,
+        'reuse_rate': round(1 - connections / requests_sent, 4) if requests_sent else 0.0,
+        'dns': dns_cache.stats(),
+    }
+
+
+register_metrics('http_pool', http_stats)
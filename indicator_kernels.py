@@ -0,0 +1,87 @@
+"""Pure NumPy indicator kernels.
+
+Every kernel works along the last axis, so a 1-D close series and a
+2-D symbols x time matrix go through the same code. Results match the
+pandas implementations in MarketAnalyzer (ewm(adjust=False), rolling
+mean/std with full windows) up to floating point rounding.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _as_float(values):
+    return np.asarray(values, dtype=np.float64)
+
+
+def ema(values, period):
+    """Exponential moving average, same as pandas ewm(span=period, adjust=False).mean()"""
+    values = _as_float(values)
+    alpha = 2 / (period + 1)
+    out = np.empty_like(values)
+    if values.shape[-1] == 0:
+        return out
+
+    if values.ndim == 1:
+        # Plain float loop: for short series this beats any per-step array operation
+        current = None
+        result = out.tolist()
+        for i, x in enumerate(values.tolist()):
+            current = x if current is None else current + alpha * (x - current)
+            result[i] = current
+        return np.array(result)
+
+    out[..., 0] = values[..., 0]
+    for i in range(1, values.shape[-1]):
+        out[..., i] = out[..., i - 1] + alpha * (values[..., i] - out[..., i - 1])
+    return out
+
+
+def sma(values, period):
+    """Rolling mean over full windows, NaN until `period` values are available"""
+    values = _as_float(values)
+    out = np.full_like(values, np.nan)
+    if values.shape[-1] < period:
+        return out
+    out[..., period - 1:] = sliding_window_view(values, period, axis=-1).mean(axis=-1)
+    return out
+
+
+def rolling_std(values, period):
+    """Rolling sample standard deviation (ddof=1) over full windows"""
+    values = _as_float(values)
+    out = np.full_like(values, np.nan)
+    if values.shape[-1] < period:
+        return out
+    out[..., period - 1:] = sliding_window_view(values, period, axis=-1).std(axis=-1, ddof=1)
+    return out
+
+
+def _gains_losses(values):
+    values = _as_float(values)
+    delta = np.zeros_like(values)
+    delta[..., 1:] = np.diff(values, axis=-1)
+    return np.clip(delta, 0, None), np.clip(-delta, 0, None)
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def rsi(values, period=14):
+    """RSI with simple rolling averages of gains and losses, as MarketAnalyzer.calculate_rsi"""
+    gains, losses = _gains_losses(values)
+    return _rsi_from_averages(sma(gains, period), sma(losses, period))
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    """MACD line and its signal line"""
+    line = ema(values, fast) - ema(values, slow)
+    return line, ema(line, signal)
+
+
+def bollinger_bands(values, period=20, width=2):
+    """Upper and lower Bollinger Bands"""
+    middle = sma(values, period)
+    std = rolling_std(values, period)
+    return middle + std * width, middle - std * width
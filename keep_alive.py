@@ -5,7 +5,8 @@ import threading
 from datetime import datetime
 from flask import Flask, jsonify
 import psutil
-import requests
+from http_pool import http_session
+from metrics import collect_metrics
 
 app = Flask(__name__)
 logging.basicConfig(
@@ -52,6 +53,11 @@ def health_check():
     logger.info("Health check request received")
     return jsonify({"status": "ok", "timestamp": datetime.now().isoformat()})
 
+@app.route('/metrics')
+def metrics():
+    """Runtime metrics endpoint"""
+    return jsonify(collect_metrics())
+
 @app.route('/')
 def home():
     bot_pid = check_bot_process()
@@ -139,7 +145,7 @@ def check_bot_health():
             logger.error("BOT_TOKEN not found in environment variables")
             return False
 
-        response = requests.get(f'https://api.telegram.org/bot{bot_token}/getMe', timeout=10)
+        response = http_session.get(f'https://api.telegram.org/bot{bot_token}/getMe', timeout=10)
         return response.status_code == 200
     except Exception as e:
         logger.error(f"Bot health check failed: {e}")
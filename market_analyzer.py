@@ -1,15 +1,124 @@
+import asyncio
 import logging
-import yfinance as yf
+import math
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import threading
 import time
-from config import MESSAGES
+from config import MESSAGES, MARKET_DATA_INTERVAL, ANALYSIS_BAR_MODE, INDICATOR_BACKEND
+import indicator_kernels
+from bar_store import bar_store, bars_to_frame
+from market_cache import analysis_cache, market_data_cache, interval_to_seconds
+from market_data_providers import get_provider
+from metrics import register_metrics
+from single_flight import SingleFlight
+from symbol_health import symbol_health, LOCAL_ERRORS
+from upstream_limiter import upstream_limiter, UpstreamBusy
+from retry_policy import fetch_policy
+from market_hours import is_market_open, last_trading_time, lookback_start, max_staleness
 
 TIMEFRAMES = [1, 5, 15, 30]  # Reduced timeframes for faster response
+LOOKBACK = timedelta(days=1)  # 1 day of trading time, not counting weekly market closures
+BAR_MINUTES = interval_to_seconds(MARKET_DATA_INTERVAL) // 60
+INDICATOR_WARMUP_BARS = 35
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # Set to DEBUG for more detailed logs
 
+# Concurrent analyses of the same symbol wait on a single in-flight run
+analysis_flight = SingleFlight()
+register_metrics('analysis_flight', analysis_flight.stats)
+
+# Background refreshes started while a stale result was served
+_background_refreshes = set()
+_refreshing_symbols = set()
+_refresh_lock = threading.Lock()
+
+def prepare_market_frame(df, symbol):
+    """Normalize a raw provider frame into native-resolution OHLCV data indexed by Datetime"""
+    # Add Volume column if missing (common for forex pairs)
+    if 'Volume' not in df.columns:
+        logger.info(f"Volume data not available for {symbol}, using placeholder values")
+        df['Volume'] = 1.0  # Use placeholder value for volume
+
+    required_columns = ['Open', 'High', 'Low', 'Close']
+    if not all(col in df.columns for col in required_columns):
+        logger.error(f"Missing required columns. Available: {df.columns}")
+        return None
+
+    # Ensure proper datetime handling
+    df = df.reset_index()
+    if 'Date' in df.columns:
+        df = df.rename(columns={'Date': 'Datetime'})
+    elif 'Datetime' not in df.columns and df.index.name == 'Datetime':
+        df = df.reset_index()
+
+    df.set_index('Datetime', inplace=True)
+    return df
+
+
+def interpolate_minutes(df, minutes):
+    """Upsample only the tail of a frame to 1-minute bars covering the last `minutes` rows"""
+    if df is None or df.empty:
+        return df
+
+    # Start from the last native bar at or before the window so the first minute is interpolated too
+    window_start = df.index[-1] - pd.Timedelta(minutes=minutes)
+    first = max(df.index.searchsorted(window_start, side='right') - 1, 0)
+    return df.iloc[first:].resample('1min').interpolate(method='time').tail(minutes)
+
+
+def timeframe_bars(minutes):
+    """Number of analysis rows covering a timeframe in the configured bar mode.
+
+    A change over N bars needs N + 1 closes, so the bar the timeframe starts from is included.
+    """
+    if ANALYSIS_BAR_MODE == 'interpolated':
+        return minutes + 1
+    return math.ceil(minutes / BAR_MINUTES) + 1
+
+
+def rows_to_bars(rows):
+    """Number of native bars needed to produce `rows` analysis rows"""
+    if ANALYSIS_BAR_MODE == 'interpolated':
+        return math.ceil((rows - 1) / BAR_MINUTES) + 1
+    return rows
+
+
+def analysis_rows():
+    """Number of rows analyze_market works on, long enough to warm up MACD (26 + 9 bars)"""
+    return max(timeframe_bars(max(TIMEFRAMES)) + 5, INDICATOR_WARMUP_BARS)
+
+
+def analysis_frame(df):
+    """Select the rows analyze_market works on from a native-resolution frame"""
+    rows = analysis_rows()
+    if ANALYSIS_BAR_MODE == 'interpolated':
+        return interpolate_minutes(df, rows)
+    return df.tail(rows)
+
+
+def incremental_start(symbol, last_ts, end_time):
+    """Start of the download window: the last stored bar, or the full lookback when cold"""
+    start_time = lookback_start(symbol, end_time, LOOKBACK)
+    if last_ts is not None:
+        start_time = max(start_time, datetime.fromtimestamp(last_ts, tz=timezone.utc))
+    return start_time
+
+
+def load_stored_frame(symbol, end_time, interval=MARKET_DATA_INTERVAL):
+    """Read the lookback window for a symbol from the bar store as a prepared frame.
+
+    The window is stretched over market closures, so the bars before a weekend still
+    warm up the indicators right after the market reopens.
+    """
+    since = lookback_start(symbol, end_time, LOOKBACK)
+    bars = bar_store.read(symbol, interval, since=int(since.timestamp()))
+    if not len(bars):
+        return None
+    return prepare_market_frame(bars_to_frame(bars), symbol)
+
+
 class MarketAnalyzer:
     def __init__(self, symbol):
         self.symbol = symbol
@@ -44,235 +153,532 @@ class MarketAnalyzer:
         lower_band = sma - (std * 2)
         return upper_band, lower_band
 
-    def get_market_data(self, minutes=30):
+    def _get_cached_market_data(self, min_bars):
+        cached_df = market_data_cache.get((self.symbol, MARKET_DATA_INTERVAL))
+        if cached_df is not None and len(cached_df) >= min_bars:
+            logger.debug(f"Cache hit for {self.symbol} ({MARKET_DATA_INTERVAL})")
+            return cached_df
+        return None
+
+    def _closed_market_data(self, min_bars):
+        """Stored bars of the last session while the market is closed, so nothing is fetched"""
+        if is_market_open(self.symbol):
+            return None
+        df = load_stored_frame(self.symbol, last_trading_time(self.symbol))
+        if df is None or len(df) < min_bars:
+            return None
+        logger.debug(f"Market closed for {self.symbol}, using stored bars of the last session")
+        market_data_cache.set((self.symbol, MARKET_DATA_INTERVAL), df)
+        return df
+
+    def _fetch_window(self):
+        """(start, end) of the next download: from the last stored bar up to the last trading time"""
+        # While the market is closed the window ends at the last session close
+        end_time = last_trading_time(self.symbol)
+        last_ts = bar_store.last_timestamp(self.symbol, MARKET_DATA_INTERVAL)
+        return incremental_start(self.symbol, last_ts, end_time), end_time
+
+    def _store_fetched(self, bars, end_time, min_bars):
+        """Append downloaded bars and load the analysis frame. Returns (df, error_key, should_retry)"""
+        logger.debug(f"Received {len(bars)} bars")
+        if len(bars):
+            bar_store.append(self.symbol, MARKET_DATA_INTERVAL, bars)
+
+        df = load_stored_frame(self.symbol, end_time)
+        if df is None or df.empty:
+            logger.warning(f"Empty DataFrame received for {self.symbol}")
+            return None, 'NO_DATA', True
+
+        data_points = len(df)
+        logger.info(f"Successfully fetched {data_points} data points for {self.symbol}")
+
+        if data_points < min_bars:
+            logger.warning(f"Insufficient data points: got {data_points}, needed {min_bars}")
+            return None, 'NO_DATA', True
+
+        market_data_cache.set((self.symbol, MARKET_DATA_INTERVAL), df)
+        return df, None, False
+
+    def _attempt_failed(self, attempt, error):
+        """Outcome of an attempt that raised. Returns (None, error_key, should_retry)"""
+        if isinstance(error, UpstreamBusy):
+            # Our own traffic is saturating the gate; retrying would only add to it
+            logger.warning(f"Attempt {attempt + 1} for {self.symbol} not sent: {error}")
+            return None, 'BUSY', False
+        logger.error(f"Attempt {attempt + 1} failed: {str(error)}")
+        return None, 'TIMEOUT_ERROR', True
+
+    @staticmethod
+    def _limiter_options(tracker):
+        """Cap the wait for an upstream slot at the time left before the deadline"""
+        if tracker is None:
+            return {}
+        return {'wait_timeout': tracker.remaining(), 'on_start': tracker.mark_sent}
+
+    def _fetch_attempt(self, min_bars, attempt, hedge=False, tracker=None):
+        """Single download attempt. Returns (df, error_key, should_retry)"""
         try:
-            end_time = datetime.now()
-            start_time = end_time - timedelta(days=1)  # 1 day lookback for better data availability
-
-            max_retries = 3
-            retry_delay = 2
-
-            for attempt in range(max_retries):
-                try:
-                    logger.debug(f"Attempt {attempt + 1}: Fetching data for {self.symbol}")
-                    logger.debug(f"Time range: {start_time} to {end_time}")
-
-                    ticker = yf.Ticker(self.symbol)
-                    df = ticker.history(
-                        start=start_time,
-                        end=end_time,
-                        interval='5m',  # Use 5m interval for better availability
-                        prepost=True
-                    )
-
-                    logger.debug(f"Received data shape: {df.shape}")
-                    logger.debug(f"Available columns: {df.columns}")
-
-                    if df.empty:
-                        logger.warning(f"Empty DataFrame received for {self.symbol}")
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (attempt + 1))
-                            continue
-                        return None, self.error_messages['NO_DATA']
-
-                    # Add Volume column if missing (common for forex pairs)
-                    if 'Volume' not in df.columns:
-                        logger.info(f"Volume data not available for {self.symbol}, using placeholder values")
-                        df['Volume'] = 1.0  # Use placeholder value for volume
-
-                    required_columns = ['Open', 'High', 'Low', 'Close']
-                    if not all(col in df.columns for col in required_columns):
-                        logger.error(f"Missing required columns. Available: {df.columns}")
-                        return None, self.error_messages['NO_DATA']
-
-                    # Ensure proper datetime handling
-                    df = df.reset_index()
-                    if 'Date' in df.columns:
-                        df = df.rename(columns={'Date': 'Datetime'})
-                    elif 'Datetime' not in df.columns and df.index.name == 'Datetime':
-                        df = df.reset_index()
-
-                    df.set_index('Datetime', inplace=True)
-
-                    # Convert to 1-minute data through interpolation
-                    df = df.resample('1min').interpolate(method='time')
-                    logger.debug(f"After resampling - shape: {df.shape}, columns: {df.columns}")
-
-                    data_points = len(df)
-                    logger.info(f"Successfully fetched {data_points} data points for {self.symbol}")
-
-                    if data_points < minutes:
-                        logger.warning(f"Insufficient data points: got {data_points}, needed {minutes}")
-                        if attempt < max_retries - 1:
-                            time.sleep(retry_delay * (attempt + 1))
-                            continue
-                        return None, self.error_messages['NO_DATA']
-
-                    return df.tail(minutes), None
-
-                except Exception as e:
-                    logger.error(f"Attempt {attempt + 1} failed: {str(e)}")
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay * (attempt + 1))
-                        continue
-                    return None, self.error_messages['TIMEOUT_ERROR']
-
+            start_time, end_time = self._fetch_window()
+            logger.debug(f"Attempt {attempt + 1}: Fetching data for {self.symbol}")
+            logger.debug(f"Time range: {start_time} to {end_time}")
+
+            # Concurrent fetches of the same symbol share one upstream request; a hedge gets its own
+            bars = upstream_limiter.call(
+                (self.symbol, MARKET_DATA_INTERVAL, hedge),
+                get_provider().fetch, self.symbol, start_time, end_time, MARKET_DATA_INTERVAL,
+                **self._limiter_options(tracker)
+            )
+            return self._store_fetched(bars, end_time, min_bars)
         except Exception as e:
-            logger.error(f"Critical error in get_market_data: {str(e)}")
-            return None, self.error_messages['GENERAL_ERROR']
-
-    def analyze_timeframe(self, df, minutes):
-        if df is None or len(df) < minutes:
-            return 'NEUTRAL', 0, {'confidence': 50, 'expiration': minutes}, None
+            return self._attempt_failed(attempt, e)
 
+    async def _fetch_attempt_async(self, min_bars, attempt, hedge=False, tracker=None):
+        """Non-blocking variant of _fetch_attempt; waiting for the upstream gate holds no thread"""
         try:
-            recent_data = df.tail(minutes)
-            close_prices = recent_data['Close']
-            volume = recent_data['Volume']
-
-            # Technical Indicators
-            ema_7 = self.calculate_ema(close_prices, 7)
-            ema_21 = self.calculate_ema(close_prices, 21)
-            rsi = self.calculate_rsi(close_prices)
-            macd, macd_signal = self.calculate_macd(close_prices)
-            upper_band, lower_band = self.calculate_bollinger_bands(close_prices)
-
-            # Price Analysis
-            start_price = close_prices.iloc[0]
-            end_price = close_prices.iloc[-1]
-            price_change = ((end_price - start_price) / start_price) * 100
-
-            # Volume Analysis
-            avg_volume = volume.mean()
-            current_volume = volume.iloc[-1]
-            volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1.0
-            volume_strength = (
-                3 if volume_ratio > 1.5 else  # Снизили порог с 2.0 до 1.5
-                2 if volume_ratio > 1.2 else  # Снизили порог с 1.5 до 1.2
-                1 if volume_ratio > 1.0 else
-                0
+            start_time, end_time = await asyncio.to_thread(self._fetch_window)
+            logger.debug(f"Attempt {attempt + 1}: Fetching data for {self.symbol}")
+            logger.debug(f"Time range: {start_time} to {end_time}")
+
+            bars = await upstream_limiter.call_async(
+                (self.symbol, MARKET_DATA_INTERVAL, hedge),
+                get_provider().fetch, self.symbol, start_time, end_time, MARKET_DATA_INTERVAL,
+                **self._limiter_options(tracker)
             )
+            return await asyncio.to_thread(self._store_fetched, bars, end_time, min_bars)
+        except Exception as e:
+            return self._attempt_failed(attempt, e)
 
-            logger.info(f"Volume analysis - ratio: {volume_ratio:.2f}, strength: {volume_strength}")
-
-            # Signal Analysis
-            trend_signals = []
+    def _record_failure(self, error_key):
+        """Record a failed fetch for the symbol. Returns the error key shown to the user"""
+        symbol_health.record_failure(self.symbol, error_key)
+        return 'TIMEOUT_ERROR' if error_key in LOCAL_ERRORS else error_key
 
-            # EMA Signals
-            ema_diff_percent = ((ema_7.iloc[-1] - ema_21.iloc[-1]) / ema_21.iloc[-1]) * 100
-            if ema_diff_percent > 0.05:  # Снизили порог с 0.1% до 0.05%
-                trend_signals.append(1)
-            elif ema_diff_percent < -0.05:
-                trend_signals.append(-1)
+    def _load_market_data(self, min_bars):
+        """Fetch native-resolution market data with retries. Returns (df, error_key)"""
+        cached_df = self._get_cached_market_data(min_bars)
+        if cached_df is not None:
+            return cached_df, None
 
-            logger.info(f"EMA analysis - diff: {ema_diff_percent:.2f}%")
+        closed_df = self._closed_market_data(min_bars)
+        if closed_df is not None:
+            return closed_df, None
 
-            # MACD Signal
-            macd_diff = macd.iloc[-1] - macd_signal.iloc[-1]
-            macd_trend = macd.iloc[-1] - macd.iloc[-2]  # Изменение MACD
-            if macd_diff > 0:
-                trend_signals.append(1)
-                if macd_trend > 0:  # Тренд MACD растет
-                    trend_signals.append(1)
-            else:
-                trend_signals.append(-1)
-                if macd_trend < 0:  # Тренд MACD падает
-                    trend_signals.append(-1)
-
-            logger.info(f"MACD analysis - diff: {macd_diff:.4f}, trend: {macd_trend:.4f}")
-
-            # RSI Signals - усилили влияние RSI
-            last_rsi = rsi.iloc[-1]
-            if last_rsi < 35:
-                trend_signals.extend([2, 1])  # Добавили дополнительный сигнал на покупку
-            elif last_rsi > 65:
-                trend_signals.extend([-2, -1])  # Добавили дополнительный сигнал на продажу
-            elif last_rsi < 45:
-                trend_signals.append(1)
-            elif last_rsi > 55:
-                trend_signals.append(-1)
+        # Symbols that recently returned nothing are answered from the cooldown cache
+        cooldown_error = symbol_health.cooldown_error(self.symbol)
+        if cooldown_error:
+            logger.info(f"Skipping fetch for {self.symbol}: cooling down after {cooldown_error}")
+            return None, cooldown_error
 
-            logger.info(f"RSI analysis - value: {last_rsi:.1f}")
+        try:
+            df, error_key = fetch_policy.run_sync(
+                lambda attempt, hedge, tracker: self._fetch_attempt(min_bars, attempt, hedge, tracker)
+            )
+            if df is not None:
+                symbol_health.record_success(self.symbol)
+                return df, None
+            return None, self._record_failure(error_key)
 
-            # Bollinger Bands Signal
-            current_price = close_prices.iloc[-1]
-            bb_position = 'normal'
-            if current_price < lower_band.iloc[-1]:
-                trend_signals.append(2)  # Strong buy signal
-                bb_position = 'oversold'
-            elif current_price > upper_band.iloc[-1]:
-                trend_signals.append(-2)  # Strong sell signal
-                bb_position = 'overbought'
+        except Exception as e:
+            logger.error(f"Critical error in get_market_data: {str(e)}")
+            return None, 'GENERAL_ERROR'
 
-            logger.info(f"BB analysis - position: {bb_position}")
+    async def _load_market_data_async(self, min_bars):
+        """Non-blocking variant of _load_market_data"""
+        cached_df = self._get_cached_market_data(min_bars)
+        if cached_df is not None:
+            return cached_df, None
 
-            # Calculate signal strength
-            trend_strength = sum(trend_signals)
-            trend_strength *= (1 + (volume_strength * 0.2))  # Volume impact
+        closed_df = self._closed_market_data(min_bars)
+        if closed_df is not None:
+            return closed_df, None
 
-            logger.info(f"Signal analysis - trend signals: {trend_signals}, final strength: {trend_strength:.2f}")
+        # Symbols that recently returned nothing are answered from the cooldown cache
+        cooldown_error = symbol_health.cooldown_error(self.symbol)
+        if cooldown_error:
+            logger.info(f"Skipping fetch for {self.symbol}: cooling down after {cooldown_error}")
+            return None, cooldown_error
 
-            # Signal determination
-            confidence = 50 + (abs(trend_strength) * 5)  # Base confidence on strength
-            confidence = min(95, max(50, confidence))  # Cap between 50-95%
+        try:
+            # Deadline-bounded retries with jittered backoff, hedged past the observed p95
+            df, error_key = await fetch_policy.run(
+                lambda attempt, hedge, tracker: self._fetch_attempt_async(min_bars, attempt, hedge, tracker)
+            )
+            if df is not None:
+                symbol_health.record_success(self.symbol)
+                return df, None
+            return None, self._record_failure(error_key)
 
-            if abs(trend_strength) >= 1.2:  # Снизили порог с 1.5 до 1.2
-                signal = 'BUY' if trend_strength > 0 else 'SELL'
-            else:
-                signal = 'NEUTRAL'
+        except Exception as e:
+            logger.error(f"Critical error in get_market_data_async: {str(e)}")
+            return None, 'GENERAL_ERROR'
 
-            logger.info(f"Final signal: {signal} with confidence: {confidence:.1f}%")
+    def _minute_data(self, df, error_key, minutes):
+        if error_key:
+            return None, self.error_messages[error_key]
+        df = interpolate_minutes(df, minutes)
+        if len(df) < minutes:
+            return None, self.error_messages['NO_DATA']
+        return df, None
 
-            indicators = {
-                'confidence': round(confidence, 1),
-                'expiration': minutes,
-                'rsi': round(last_rsi, 2),
-                'macd': round(macd.iloc[-1], 4),
-                'bb_position': bb_position
+    def get_market_data(self, minutes=30):
+        """Last `minutes` of 1-minute data, interpolated from native bars"""
+        df, error_key = self._load_market_data(math.ceil((minutes - 1) / BAR_MINUTES) + 1)
+        return self._minute_data(df, error_key, minutes)
+
+    async def get_market_data_async(self, minutes=30):
+        """Non-blocking variant of get_market_data for use inside the event loop"""
+        df, error_key = await self._load_market_data_async(math.ceil((minutes - 1) / BAR_MINUTES) + 1)
+        return self._minute_data(df, error_key, minutes)
+
+    def _compute_indicators(self, close_prices):
+        """Indicator series over a close price series, as NumPy arrays"""
+        if INDICATOR_BACKEND == 'numpy':
+            values = close_prices.to_numpy(dtype=np.float64)
+            macd, macd_signal = indicator_kernels.macd(values)
+            upper_band, lower_band = indicator_kernels.bollinger_bands(values)
+            return {
+                'ema_7': indicator_kernels.ema(values, 7),
+                'ema_21': indicator_kernels.ema(values, 21),
+                'rsi': indicator_kernels.rsi(values),
+                'macd': macd,
+                'macd_signal': macd_signal,
+                'upper_band': upper_band,
+                'lower_band': lower_band,
             }
 
+        macd, macd_signal = self.calculate_macd(close_prices)
+        upper_band, lower_band = self.calculate_bollinger_bands(close_prices)
+        series = {
+            'ema_7': self.calculate_ema(close_prices, 7),
+            'ema_21': self.calculate_ema(close_prices, 21),
+            'rsi': self.calculate_rsi(close_prices),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'upper_band': upper_band,
+            'lower_band': lower_band,
+        }
+        return {name: values.to_numpy() for name, values in series.items()}
+
+    def _score_timeframe(self, close_prices, volume, series, minutes):
+        """Score one timeframe from its close/volume arrays and indicator arrays ending at the same bar"""
+        ema_7, ema_21 = series['ema_7'], series['ema_21']
+        rsi = series['rsi']
+        macd, macd_signal = series['macd'], series['macd_signal']
+        upper_band, lower_band = series['upper_band'], series['lower_band']
+
+        # Price Analysis
+        start_price = close_prices[0]
+        end_price = close_prices[-1]
+        price_change = ((end_price - start_price) / start_price) * 100
+
+        # Volume Analysis
+        avg_volume = volume.mean()
+        current_volume = volume[-1]
+        volume_ratio = current_volume / avg_volume if avg_volume > 0 else 1.0
+        volume_strength = (
+            3 if volume_ratio > 1.5 else  # Снизили порог с 2.0 до 1.5
+            2 if volume_ratio > 1.2 else  # Снизили порог с 1.5 до 1.2
+            1 if volume_ratio > 1.0 else
+            0
+        )
+
+        logger.info(f"Volume analysis - ratio: {volume_ratio:.2f}, strength: {volume_strength}")
+
+        # Signal Analysis
+        trend_signals = []
+
+        # EMA Signals
+        ema_diff_percent = ((ema_7[-1] - ema_21[-1]) / ema_21[-1]) * 100
+        if ema_diff_percent > 0.05:  # Снизили порог с 0.1% до 0.05%
+            trend_signals.append(1)
+        elif ema_diff_percent < -0.05:
+            trend_signals.append(-1)
+
+        logger.info(f"EMA analysis - diff: {ema_diff_percent:.2f}%")
+
+        # MACD Signal
+        macd_diff = macd[-1] - macd_signal[-1]
+        macd_trend = macd[-1] - macd[-2]  # Изменение MACD
+        if macd_diff > 0:
+            trend_signals.append(1)
+            if macd_trend > 0:  # Тренд MACD растет
+                trend_signals.append(1)
+        else:
+            trend_signals.append(-1)
+            if macd_trend < 0:  # Тренд MACD падает
+                trend_signals.append(-1)
+
+        logger.info(f"MACD analysis - diff: {macd_diff:.4f}, trend: {macd_trend:.4f}")
+
+        # RSI Signals - усилили влияние RSI
+        last_rsi = rsi[-1]
+        if last_rsi < 35:
+            trend_signals.extend([2, 1])  # Добавили дополнительный сигнал на покупку
+        elif last_rsi > 65:
+            trend_signals.extend([-2, -1])  # Добавили дополнительный сигнал на продажу
+        elif last_rsi < 45:
+            trend_signals.append(1)
+        elif last_rsi > 55:
+            trend_signals.append(-1)
+
+        logger.info(f"RSI analysis - value: {last_rsi:.1f}")
+
+        # Bollinger Bands Signal
+        current_price = close_prices[-1]
+        bb_position = 'normal'
+        if current_price < lower_band[-1]:
+            trend_signals.append(2)  # Strong buy signal
+            bb_position = 'oversold'
+        elif current_price > upper_band[-1]:
+            trend_signals.append(-2)  # Strong sell signal
+            bb_position = 'overbought'
+
+        logger.info(f"BB analysis - position: {bb_position}")
+
+        # Calculate signal strength
+        trend_strength = sum(trend_signals)
+        trend_strength *= (1 + (volume_strength * 0.2))  # Volume impact
+
+        logger.info(f"Signal analysis - trend signals: {trend_signals}, final strength: {trend_strength:.2f}")
+
+        # Signal determination
+        confidence = 50 + (abs(trend_strength) * 5)  # Base confidence on strength
+        confidence = min(95, max(50, confidence))  # Cap between 50-95%
+
+        if abs(trend_strength) >= 1.2:  # Снизили порог с 1.5 до 1.2
+            signal = 'BUY' if trend_strength > 0 else 'SELL'
+        else:
+            signal = 'NEUTRAL'
+
+        logger.info(f"Final signal: {signal} with confidence: {confidence:.1f}%")
+
+        indicators = {
+            'confidence': round(confidence, 1),
+            'expiration': minutes,
+            'rsi': round(last_rsi, 2),
+            'macd': round(macd[-1], 4),
+            'bb_position': bb_position
+        }
+
+        return signal, price_change, indicators
+
+    def analyze_timeframe(self, df, minutes, bars=None):
+        """Analyze one timeframe, computing indicators over its own tail"""
+        rows = minutes if bars is None else bars
+        if df is None or len(df) < rows:
+            return 'NEUTRAL', 0, {'confidence': 50, 'expiration': minutes}, None
+
+        try:
+            recent_data = df.tail(rows)
+            series = self._compute_indicators(recent_data['Close'])
+            signal, price_change, indicators = self._score_timeframe(
+                recent_data['Close'].to_numpy(), recent_data['Volume'].to_numpy(), series, minutes
+            )
             return signal, price_change, indicators, None
 
         except Exception as e:
             logger.error(f"Analysis error: {str(e)}")
             return 'NEUTRAL', 0, {'confidence': 50, 'expiration': minutes}, str(e)
 
-    def analyze_market(self):
+    def analyze_timeframes(self, df):
+        """Analyze all TIMEFRAMES, computing indicator series once and slicing them per timeframe.
+
+        Returns {minutes: (signal, change, indicators, error)}.
+        """
+        results = {}
+        close_prices = df['Close'].to_numpy()
+        volume = df['Volume'].to_numpy()
+        try:
+            series = self._compute_indicators(df['Close'])
+        except Exception as e:
+            logger.error(f"Indicator error: {str(e)}")
+            return {minutes: ('NEUTRAL', 0, {'confidence': 50, 'expiration': minutes}, str(e)) for minutes in TIMEFRAMES}
+
+        for minutes in TIMEFRAMES:
+            rows = timeframe_bars(minutes)
+            if len(df) < rows:
+                results[minutes] = ('NEUTRAL', 0, {'confidence': 50, 'expiration': minutes}, None)
+                continue
+
+            try:
+                signal, price_change, indicators = self._score_timeframe(
+                    close_prices[-rows:], volume[-rows:], series, minutes
+                )
+                results[minutes] = (signal, price_change, indicators, None)
+            except Exception as e:
+                logger.error(f"Analysis error: {str(e)}")
+                results[minutes] = ('NEUTRAL', 0, {'confidence': 50, 'expiration': minutes}, str(e))
+        return results
+
+    def _analyze_data(self, df):
+        df = analysis_frame(df)
+        current_price = df['Close'].iloc[-1]
+        timeframe_analysis = {}
+
+        for minutes, (signal, change, indicators, error) in self.analyze_timeframes(df).items():
+            if error:
+                logger.error(f"Error analyzing {minutes}min timeframe: {error}")
+
+            timeframe_analysis[minutes] = {
+                'signal': signal,
+                'change': change,
+                'indicators': indicators
+            }
+            logger.debug(f"{minutes}min analysis complete - Signal: {signal}, Change: {change:.2f}%")
+
+        return {
+            'current_price': current_price,
+            'timeframes': timeframe_analysis,
+            'timestamp': datetime.now(),
+            'last_bar': df.index[-1],
+            'market_data': df  # Frame the analysis was run on, reused for charts
+        }
+
+    def _analyze_cached(self, df):
+        """Analyze a frame, sharing the result across users until the next bar"""
+        cache_key = (self.symbol, df.index[-1])
+        result = analysis_cache.get(cache_key)
+        if result is None:
+            result = self._analyze_data(df)
+            analysis_cache.set(cache_key, result)
+        return result
+
+    def peek_cached_analysis(self):
+        """Localized analysis for the current bar if one is already cached, without fetching.
+
+        None while the market is closed: that result has to go out marked as the last session's.
+        """
+        if not is_market_open(self.symbol):
+            return None
+        df = self._get_cached_market_data(rows_to_bars(analysis_rows()))
+        if df is None:
+            return None
+        result = analysis_cache.get((self.symbol, df.index[-1]))
+        return self._localize_result(result) if result is not None else None
+
+    def _localize_result(self, result):
+        """Attach the localized error message to a language-neutral result"""
+        if 'error_code' in result:
+            return {**result, 'error': self.error_messages[result['error_code']]}
+        return dict(result)
+
+    def _closed_market_result(self):
+        """Analysis of the last session's final bar while the market is closed, marked with its age.
+
+        Reads stored bars only; a result cached for an earlier bar of the session is not reused.
+        """
+        if is_market_open(self.symbol):
+            return None
+        df = self._closed_market_data(rows_to_bars(analysis_rows()))
+        if df is None:
+            return None
+        result = self._analyze_cached(df)
+        age = time.time() - result['last_bar'].timestamp() - BAR_MINUTES * 60
+        return {**self._localize_result(result), 'age': max(0, int(age)), 'stale': True, 'market_closed': True}
+
+    def _stale_result(self):
+        """Last analysis for the symbol marked with its age, if still within the allowed staleness"""
+        latest = analysis_cache.latest(self.symbol)
+        if latest is None:
+            return None
+        result, stored_at = latest
+        age = time.time() - stored_at
+        if age > max_staleness(self.symbol):
+            return None
+        return {**self._localize_result(result), 'age': int(age), 'stale': True}
+
+    def _refresh_in_thread(self):
+        with _refresh_lock:
+            if self.symbol in _refreshing_symbols:
+                return
+            _refreshing_symbols.add(self.symbol)
+
+        def refresh():
+            try:
+                self._run_analysis()
+            finally:
+                with _refresh_lock:
+                    _refreshing_symbols.discard(self.symbol)
+
+        threading.Thread(target=refresh, name=f'refresh-{self.symbol}', daemon=True).start()
+
+    def analyze_market(self, allow_stale=False):
+        """Analyze the symbol. With allow_stale, return the last result at once and refresh in the background"""
+        closed = self._closed_market_result()
+        if closed is not None:
+            return closed
+        if allow_stale:
+            cached = self.peek_cached_analysis()
+            if cached is not None:
+                return cached
+            stale = self._stale_result()
+            if stale is not None:
+                logger.info(f"Serving {stale['age']}s old analysis for {self.symbol} while refreshing")
+                self._refresh_in_thread()
+                return stale
+        return self._run_analysis()
+
+    def _run_analysis(self):
         try:
             logger.info(f"Starting market analysis for {self.symbol}")
-            df, error_message = self.get_market_data(minutes=max(TIMEFRAMES) + 5)
+            df, error_key = self._load_market_data(rows_to_bars(analysis_rows()))
 
-            if error_message:
-                logger.error(f"Market data error for {self.symbol}: {error_message}")
-                return {'error': error_message}
+            if error_key:
+                logger.error(f"Market data error for {self.symbol}: {error_key}")
+                return self._localize_result({'error_code': error_key})
 
             if df is None or df.empty:
                 logger.error(f"No market data available for {self.symbol}")
-                return {'error': self.error_messages['NO_DATA']}
+                return self._localize_result({'error_code': 'NO_DATA'})
 
-            current_price = df['Close'].iloc[-1]
-            timeframe_analysis = {}
+            return self._localize_result(self._analyze_cached(df))
 
-            for minutes in TIMEFRAMES:
-                logger.debug(f"Analyzing {minutes}min timeframe for {self.symbol}")
-                signal, change, indicators, error = self.analyze_timeframe(df, minutes)
+        except Exception as e:
+            logger.error(f"Market analysis error for {self.symbol}: {str(e)}")
+            return self._localize_result({'error_code': 'GENERAL_ERROR'})
 
-                if error:
-                    logger.error(f"Error analyzing {minutes}min timeframe: {error}")
+    async def _run_analysis_async(self):
+        try:
+            logger.info(f"Starting async market analysis for {self.symbol}")
+            df, error_key = await self._load_market_data_async(rows_to_bars(analysis_rows()))
 
-                timeframe_analysis[minutes] = {
-                    'signal': signal,
-                    'change': change,
-                    'indicators': indicators
-                }
-                logger.debug(f"{minutes}min analysis complete - Signal: {signal}, Change: {change:.2f}%")
+            if error_key:
+                logger.error(f"Market data error for {self.symbol}: {error_key}")
+                return {'error_code': error_key}
 
-            return {
-                'current_price': current_price,
-                'timeframes': timeframe_analysis,
-                'timestamp': datetime.now()
-            }
+            if df is None or df.empty:
+                logger.error(f"No market data available for {self.symbol}")
+                return {'error_code': 'NO_DATA'}
+
+            return await asyncio.to_thread(self._analyze_cached, df)
 
         except Exception as e:
             logger.error(f"Market analysis error for {self.symbol}: {str(e)}")
-            return {'error': self.error_messages['GENERAL_ERROR']}
\ No newline at end of file
+            return {'error_code': 'GENERAL_ERROR'}
+
+    async def analyze_market_async(self, allow_stale=False):
+        """Run analyze_market without blocking the event loop.
+
+        Concurrent calls for the same symbol share one fetch and analysis. With allow_stale,
+        the last result is returned at once (marked with 'age' and 'stale') and refreshed
+        in the background. While the market is closed the last session's analysis is served.
+        """
+        if not is_market_open(self.symbol):
+            # Stored bars only, but reading and analyzing them stays off the event loop
+            closed = await asyncio.to_thread(self._closed_market_result)
+            if closed is not None:
+                return closed
+        if allow_stale:
+            cached = self.peek_cached_analysis()
+            if cached is not None:
+                return cached
+            stale = self._stale_result()
+            if stale is not None:
+                logger.info(f"Serving {stale['age']}s old analysis for {self.symbol} while refreshing")
+                task = asyncio.ensure_future(analysis_flight.run(self.symbol, self._run_analysis_async))
+                _background_refreshes.add(task)
+                task.add_done_callback(_background_refreshes.discard)
+                return stale
+
+        result = await analysis_flight.run(self.symbol, self._run_analysis_async)
+        return self._localize_result(result)
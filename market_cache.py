@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    MARKET_DATA_INTERVAL, MARKET_DATA_CACHE_SIZE, MARKET_DATA_CACHE_GRACE, ANALYSIS_CACHE_SIZE, CHART_CACHE_SIZE
+)
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '2m': 120,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '60m': 3600,
+    '1h': 3600,
+}
+
+
+def interval_to_seconds(interval):
+    """Convert a provider interval string such as '5m' to seconds"""
+    if interval not in INTERVAL_SECONDS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return INTERVAL_SECONDS[interval]
+
+
+def next_bar_close(now, bar_seconds):
+    """Return the epoch timestamp at which the current bar closes"""
+    return (int(now // bar_seconds) + 1) * bar_seconds
+
+
+class BarAlignedCache:
+    """Thread-safe LRU cache whose entries expire when the current bar closes"""
+
+    def __init__(self, max_size=128, bar_seconds=300, grace_seconds=0):
+        self.max_size = max_size
+        self.bar_seconds = bar_seconds
+        self.grace_seconds = grace_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def expiry_for(self, now=None):
+        """Expiry timestamp for an entry stored at `now`"""
+        now = time.time() if now is None else now
+        return next_bar_close(now, self.bar_seconds) + self.grace_seconds
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if now >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, expires_at=None):
+        if expires_at is None:
+            expires_at = self.expiry_for()
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                logger.debug(f"Evicted {evicted_key} from cache")
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class AnalysisCache(BarAlignedCache):
+    """Bar-aligned cache of (symbol, bar) keys that also keeps each symbol's latest value past expiry"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._latest = {}
+
+    def set(self, key, value, expires_at=None):
+        super().set(key, value, expires_at)
+        with self._lock:
+            symbol = key[0]
+            previous = self._latest.get(symbol)
+            # Never let a late write for an older bar replace a newer result
+            if previous is None or previous[0][1] <= key[1]:
+                self._latest[symbol] = (key, value, time.time())
+
+    def latest(self, symbol):
+        """(value, stored_at) of the most recent entry for symbol, expired or not"""
+        with self._lock:
+            entry = self._latest.get(symbol)
+            return (entry[1], entry[2]) if entry else None
+
+    def clear(self):
+        super().clear()
+        with self._lock:
+            self._latest.clear()
+
+
+# Shared OHLCV cache keyed by (symbol, interval)
+market_data_cache = BarAlignedCache(
+    max_size=MARKET_DATA_CACHE_SIZE,
+    bar_seconds=interval_to_seconds(MARKET_DATA_INTERVAL),
+    grace_seconds=MARKET_DATA_CACHE_GRACE
+)
+register_metrics('market_data_cache', market_data_cache.stats)
+
+# Language-neutral analysis results keyed by (symbol, last bar timestamp), shared by all users
+analysis_cache = AnalysisCache(
+    max_size=ANALYSIS_CACHE_SIZE,
+    bar_seconds=interval_to_seconds(MARKET_DATA_INTERVAL),
+    grace_seconds=MARKET_DATA_CACHE_GRACE
+)
+register_metrics('analysis_cache', analysis_cache.stats)
+
+# Charts keyed by (symbol, last bar timestamp, variant): PNG bytes until uploaded, then the Telegram file_id
+chart_cache = BarAlignedCache(
+    max_size=CHART_CACHE_SIZE,
+    bar_seconds=interval_to_seconds(MARKET_DATA_INTERVAL),
+    grace_seconds=MARKET_DATA_CACHE_GRACE
+)
+register_metrics('chart_cache', chart_cache.stats)
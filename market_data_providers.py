@@ -0,0 +1,268 @@
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from bar_store import BAR_DTYPE, EMPTY_BARS, frame_to_bars
+from config import MARKET_DATA_PROVIDER, MARKET_DATA_REPLAY_DIR, MARKET_DATA_SYNTHETIC_SEED
+from market_cache import interval_to_seconds
+
+logger = logging.getLogger(__name__)
+
+
+def _epoch(value):
+    """Convert a datetime (naive values are treated as UTC) to epoch seconds"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+class MarketDataProvider:
+    """Source of OHLCV bars. Implementations return BAR_DTYPE arrays sorted by time"""
+
+    name = 'base'
+
+    def fetch(self, symbol, start, end, interval):
+        """Return bars for symbol with open times in [start, end)"""
+        raise NotImplementedError
+
+    def fetch_many(self, symbols, start, end, interval):
+        """Return a dict of symbol -> bars. Providers may override with a batched request"""
+        results = {}
+        for symbol in symbols:
+            try:
+                results[symbol] = self.fetch(symbol, start, end, interval)
+            except Exception as e:
+                logger.error(f"Error fetching {symbol} from {self.name}: {e}")
+        return results
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Live bars from Yahoo Finance through yfinance"""
+
+    name = 'yfinance'
+
+    def __init__(self):
+        # Tickers are reused so their timezone and metadata lookups happen once per symbol;
+        # yfinance itself shares one pooled curl_cffi session across all of them
+        self._tickers = {}
+        self._lock = threading.Lock()
+
+    def _ticker(self, symbol):
+        with self._lock:
+            ticker = self._tickers.get(symbol)
+            if ticker is None:
+                ticker = self._tickers[symbol] = yf.Ticker(symbol)
+            return ticker
+
+    def fetch(self, symbol, start, end, interval):
+        ticker = self._ticker(symbol)
+        df = ticker.history(start=start, end=end, interval=interval, prepost=True)
+        logger.debug(f"Received data shape: {df.shape}")
+        if df.empty:
+            return EMPTY_BARS
+        bars = frame_to_bars(df)
+        return EMPTY_BARS if bars is None else bars
+
+    def fetch_many(self, symbols, start, end, interval):
+        """Download all symbols in a single multi-ticker request"""
+        data = yf.download(
+            tickers=list(symbols),
+            start=start,
+            end=end,
+            interval=interval,
+            group_by='ticker',
+            prepost=True,
+            threads=True,
+            progress=False
+        )
+        results = {}
+        if data is None or data.empty:
+            return results
+
+        available = set(data.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol not in available:
+                logger.warning(f"No data for {symbol} in bulk download")
+                continue
+            df = data[symbol].dropna(how='all')
+            bars = frame_to_bars(df) if not df.empty else None
+            if bars is not None and len(bars):
+                results[symbol] = bars
+        return results
+
+
+class YahooChartProvider(MarketDataProvider):
+    """Live bars from the Yahoo chart endpoint over a pooled async HTTP client, without DataFrames"""
+
+    name = 'yahoo_chart'
+
+    def __init__(self, client=None):
+        if client is None:
+            from yahoo_chart import get_chart_client  # Needs the optional aiohttp package
+            client = get_chart_client()
+        self.client = client
+
+    def fetch(self, symbol, start, end, interval):
+        return self.client.fetch(symbol, start, end, interval)
+
+    def fetch_many(self, symbols, start, end, interval):
+        return self.client.fetch_many(symbols, start, end, interval)
+
+
+class ReplayProvider(MarketDataProvider):
+    """Replays recorded bars from <directory>/<symbol>.csv or .parquet files.
+
+    Files use the yfinance layout (Datetime index, Open/High/Low/Close/Volume).
+    With shift_to_now the recording is moved in time so its last bar is the
+    current one, which lets old recordings drive the live code paths.
+    """
+
+    name = 'replay'
+
+    def __init__(self, directory=MARKET_DATA_REPLAY_DIR, shift_to_now=True):
+        self.directory = directory
+        self.shift_to_now = shift_to_now
+        self._recordings = {}
+        self._lock = threading.Lock()
+
+    def _load(self, symbol):
+        with self._lock:
+            if symbol in self._recordings:
+                return self._recordings[symbol]
+
+            bars = EMPTY_BARS
+            for extension, reader in (('.parquet', pd.read_parquet), ('.csv', self._read_csv)):
+                path = os.path.join(self.directory, f"{symbol}{extension}")
+                if os.path.exists(path):
+                    bars = frame_to_bars(reader(path))
+                    if bars is None:
+                        bars = EMPTY_BARS
+                    logger.info(f"Loaded {len(bars)} replay bars for {symbol} from {path}")
+                    break
+            else:
+                logger.warning(f"No replay recording for {symbol} in {self.directory}")
+
+            self._recordings[symbol] = bars
+            return bars
+
+    @staticmethod
+    def _read_csv(path):
+        return pd.read_csv(path, index_col=0, parse_dates=True)
+
+    def fetch(self, symbol, start, end, interval):
+        bars = self._load(symbol)
+        if not len(bars):
+            return EMPTY_BARS
+
+        if self.shift_to_now:
+            bar_seconds = interval_to_seconds(interval)
+            now_bar = int(datetime.now(timezone.utc).timestamp()) // bar_seconds * bar_seconds
+            bars = bars.copy()
+            bars['ts'] += now_bar - bars['ts'][-1]
+
+        start_ts, end_ts = _epoch(start), _epoch(end)
+        return bars[(bars['ts'] >= start_ts) & (bars['ts'] < end_ts)]
+
+
+class SyntheticProvider(MarketDataProvider):
+    """Deterministic random-walk candles, seeded per symbol and per day.
+
+    Daily anchor levels follow a random walk from a fixed origin and each
+    day is filled with a Brownian bridge between its anchors, so any window
+    returns the same bars no matter how the requests are split.
+    """
+
+    name = 'synthetic'
+    origin = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    base_price = 100.0
+
+    def __init__(self, seed=MARKET_DATA_SYNTHETIC_SEED, volatility=0.0015):
+        self.seed = seed
+        self.volatility = volatility
+        self._anchors = {}
+        self._lock = threading.Lock()
+
+    def _symbol_seed(self, symbol):
+        return zlib.crc32(symbol.encode())
+
+    def _daily_anchors(self, symbol, days):
+        with self._lock:
+            anchors = self._anchors.get(symbol)
+            if anchors is None or len(anchors) < days + 2:
+                rng = np.random.default_rng([self.seed, self._symbol_seed(symbol)])
+                steps = rng.normal(0, self.volatility * 12, days + 32)
+                anchors = np.concatenate(([0.0], np.cumsum(steps)))
+                self._anchors[symbol] = anchors
+            return anchors
+
+    def _day_bars(self, symbol, day, bar_seconds, anchors):
+        per_day = 86400 // bar_seconds
+        rng = np.random.default_rng([self.seed, self._symbol_seed(symbol), day])
+
+        # Brownian bridge between the day's anchors with a small trend component
+        trend = np.repeat(rng.choice([-1, 0, 1], size=8), -(-per_day // 8))[:per_day] * self.volatility * 0.3
+        walk = np.cumsum(rng.normal(0, self.volatility, per_day) + trend)
+        position = np.arange(1, per_day + 1) / per_day
+        log_close = anchors[day] + walk - position * walk[-1] + position * (anchors[day + 1] - anchors[day])
+        close = self.base_price * np.exp(log_close)
+        open_ = np.concatenate(([self.base_price * np.exp(anchors[day])], close[:-1]))
+
+        bars = np.empty(per_day, dtype=BAR_DTYPE)
+        day_start = _epoch(self.origin) + day * 86400
+        bars['ts'] = day_start + np.arange(per_day) * bar_seconds
+        bars['open'] = open_
+        bars['close'] = close
+        bars['high'] = np.maximum(open_, close) * (1 + rng.uniform(0.0001, 0.0008, per_day))
+        bars['low'] = np.minimum(open_, close) * (1 - rng.uniform(0.0001, 0.0008, per_day))
+        bars['volume'] = rng.uniform(100000, 1000000, per_day)
+        return bars
+
+    def fetch(self, symbol, start, end, interval):
+        bar_seconds = interval_to_seconds(interval)
+        origin_ts = _epoch(self.origin)
+        start_ts = max(_epoch(start), origin_ts)
+        end_ts = min(_epoch(end), int(datetime.now(timezone.utc).timestamp()))
+        if end_ts <= start_ts:
+            return EMPTY_BARS
+
+        first_day = (start_ts - origin_ts) // 86400
+        last_day = (end_ts - 1 - origin_ts) // 86400
+        anchors = self._daily_anchors(symbol, last_day + 1)
+        bars = np.concatenate([
+            self._day_bars(symbol, day, bar_seconds, anchors)
+            for day in range(first_day, last_day + 1)
+        ])
+        return bars[(bars['ts'] >= start_ts) & (bars['ts'] < end_ts)]
+
+
+PROVIDERS = {
+    YFinanceProvider.name: YFinanceProvider,
+    YahooChartProvider.name: YahooChartProvider,
+    ReplayProvider.name: ReplayProvider,
+    SyntheticProvider.name: SyntheticProvider,
+}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def create_provider(name):
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown market data provider: {name}")
+    return PROVIDERS[name]()
+
+
+def get_provider():
+    """Return the process-wide provider selected by MARKET_DATA_PROVIDER"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = create_provider(MARKET_DATA_PROVIDER)
+            logger.info(f"Using market data provider: {_provider.name}")
+        return _provider
@@ -0,0 +1,98 @@
+import logging
+from datetime import datetime, timedelta, timezone
+
+from config import MAX_STALENESS, MAX_STALENESS_WEEKEND
+
+logger = logging.getLogger(__name__)
+
+# Currencies whose pairs trade thinner hours than the majors
+EXOTIC_CURRENCIES = ('TRY', 'INR', 'BRL', 'MXN', 'ZAR', 'CNH')
+
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+
+def week_minute(weekday, hour=0, minute=0):
+    """Minutes since Monday 00:00 UTC"""
+    return weekday * MINUTES_PER_DAY + hour * 60 + minute
+
+
+# Weekly closures per asset class as [start, end) minutes since Monday 00:00 UTC
+MARKET_CLOSURES = {
+    'fx': [(week_minute(4, 22), week_minute(6, 22))],  # Friday 22:00 to Sunday 22:00
+    'exotic': [(week_minute(4, 21), MINUTES_PER_WEEK)],  # Friday 21:00 to Monday 00:00
+    'crypto': [],  # Trades 24/7
+}
+
+
+def get_asset_class(symbol):
+    """Asset class of a Yahoo symbol: 'crypto', 'exotic' or 'fx'"""
+    if symbol.endswith('=X'):
+        code = symbol[:-2]
+        if any(currency in code for currency in EXOTIC_CURRENCIES):
+            return 'exotic'
+        return 'fx'
+    return 'crypto'
+
+
+def is_weekend(now=None):
+    now = now or datetime.now(timezone.utc)
+    return now.weekday() >= 5
+
+
+def max_staleness(symbol, now=None):
+    """Seconds an analysis for symbol may be served stale"""
+    asset_class = get_asset_class(symbol)
+    if is_weekend(now):
+        return MAX_STALENESS_WEEKEND.get(asset_class, MAX_STALENESS[asset_class])
+    return MAX_STALENESS[asset_class]
+
+
+def _current_closure(symbol, now):
+    """(start, end) week minutes of the closure now falls into, or None while trading"""
+    minute = week_minute(now.weekday(), now.hour, now.minute)
+    for start, end in MARKET_CLOSURES[get_asset_class(symbol)]:
+        if start <= minute < end:
+            return start, end
+    return None
+
+
+def is_market_open(symbol, now=None):
+    now = now or datetime.now(timezone.utc)
+    return _current_closure(symbol, now) is None
+
+
+def closed_time(symbol, start, end):
+    """Time between start and end that falls into the symbol's weekly closures"""
+    closures = MARKET_CLOSURES[get_asset_class(symbol)]
+    closed = timedelta(0)
+    week_start = (start - timedelta(days=start.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    while closures and week_start < end:
+        for closure_start, closure_end in closures:
+            overlap = (min(end, week_start + timedelta(minutes=closure_end))
+                       - max(start, week_start + timedelta(minutes=closure_start)))
+            if overlap > timedelta(0):
+                closed += overlap
+        week_start += timedelta(days=7)
+    return closed
+
+
+def lookback_start(symbol, end_time, lookback):
+    """Start of a window ending at end_time with `lookback` of trading time, stretched over closures"""
+    start = end_time - lookback
+    while True:
+        extended = end_time - lookback - closed_time(symbol, start, end_time)
+        if extended == start:
+            return start
+        start = extended
+
+
+def last_trading_time(symbol, now=None):
+    """`now` while the market is open, otherwise the moment the last session closed"""
+    now = now or datetime.now(timezone.utc)
+    closure = _current_closure(symbol, now)
+    if closure is None:
+        return now
+    week_start = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return week_start + timedelta(minutes=closure[0])
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from config import CURRENCY_PAIRS, MARKET_DATA_INTERVAL, PREFETCH_ENABLED, PREFETCH_DELAY
+from bar_store import bar_store
+from market_analyzer import incremental_start, load_stored_frame
+from market_cache import market_data_cache, interval_to_seconds, next_bar_close
+from market_data_providers import get_provider
+from metrics import register_metrics
+from symbol_health import symbol_health
+from market_hours import is_market_open
+from upstream_limiter import upstream_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class MarketPrefetcher:
+    """Refreshes the market data cache for all pairs with one batched fetch per bar"""
+
+    def __init__(self, symbols, interval=MARKET_DATA_INTERVAL, delay=PREFETCH_DELAY):
+        self.symbols = list(dict.fromkeys(symbols))
+        self.interval = interval
+        self.delay = delay
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.failures = 0
+        self.last_run = None
+        self.last_duration = None
+        self.last_refreshed = 0
+
+    def refresh(self):
+        """Run one prefetch cycle. Returns the number of symbols refreshed"""
+        started = time.monotonic()
+        # Symbols on a failure cooldown or with a closed market are left out of the batch
+        symbols = [
+            symbol for symbol in self.symbols
+            if is_market_open(symbol) and not symbol_health.is_cooling_down(symbol)
+        ]
+        if not symbols:
+            return 0
+        try:
+            # Only request bars newer than what every symbol already has on disk
+            end_time = datetime.now(timezone.utc)
+            start_time = min(
+                incremental_start(symbol, bar_store.last_timestamp(symbol, self.interval), end_time)
+                for symbol in symbols
+            )
+            fetched = upstream_limiter.call(
+                ('prefetch', self.interval),
+                get_provider().fetch_many, symbols, start_time, end_time, self.interval
+            )
+            if not fetched:
+                logger.warning("Bulk prefetch returned no data")
+                self.failures += 1
+                return 0
+
+            refreshed = 0
+            for symbol in symbols:
+                bars = fetched.get(symbol)
+                if bars is not None and len(bars):
+                    bar_store.append(symbol, self.interval, bars)
+                df = load_stored_frame(symbol, end_time, self.interval)
+                if df is None or df.empty:
+                    symbol_health.record_failure(symbol, 'NO_DATA')
+                    continue
+                if bars is not None and len(bars):
+                    symbol_health.record_success(symbol)
+                    market_data_cache.set((symbol, self.interval), df)
+                    refreshed += 1
+
+            self.last_refreshed = refreshed
+            logger.info(f"Prefetched {refreshed}/{len(symbols)} symbols in {time.monotonic() - started:.2f}s")
+            return refreshed
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Bulk prefetch failed: {e}")
+            return 0
+        finally:
+            self.runs += 1
+            self.last_run = datetime.now()
+            self.last_duration = round(time.monotonic() - started, 3)
+
+    def _run(self):
+        bar_seconds = interval_to_seconds(self.interval)
+        self.refresh()  # Warm the cache on startup
+        while not self._stop_event.is_set():
+            wake_at = next_bar_close(time.time(), bar_seconds) + self.delay
+            if self._stop_event.wait(max(0.0, wake_at - time.time())):
+                break
+            self.refresh()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='market-prefetcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Market prefetcher started for {len(self.symbols)} symbols")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self):
+        return {
+            'symbols': len(self.symbols),
+            'runs': self.runs,
+            'failures': self.failures,
+            'last_run': self.last_run.isoformat() if self.last_run else None,
+            'last_duration': self.last_duration,
+            'last_refreshed': self.last_refreshed,
+        }
+
+
+prefetcher = MarketPrefetcher(CURRENCY_PAIRS.values())
+register_metrics('prefetcher', prefetcher.stats)
+
+
+def start_prefetcher():
+    """Start the background prefetcher if enabled in config"""
+    if not PREFETCH_ENABLED:
+        logger.info("Market prefetcher is disabled")
+        return
+    prefetcher.start()
@@ -0,0 +1,152 @@
+import logging
+from datetime import datetime, timezone
+
+import numpy as np
+
+import indicator_kernels
+from config import CURRENCY_PAIRS, MARKET_DATA_INTERVAL
+from market_analyzer import TIMEFRAMES, analysis_rows, load_stored_frame, timeframe_bars
+from market_cache import market_data_cache
+
+logger = logging.getLogger(__name__)
+
+SYMBOL_NAMES = {symbol: pair for pair, symbol in CURRENCY_PAIRS.items()}
+
+
+def collect_frames(symbols, interval=MARKET_DATA_INTERVAL):
+    """Cached frames for the symbols, falling back to the bar store. Never hits the network"""
+    frames = {}
+    now = datetime.now(timezone.utc)
+    for symbol in symbols:
+        df = market_data_cache.get((symbol, interval))
+        if df is None:
+            df = load_stored_frame(symbol, now, interval)
+        if df is not None and not df.empty:
+            frames[symbol] = df
+    return frames
+
+
+def build_price_matrix(frames, rows):
+    """Stack the last `rows` closes and volumes of every frame into symbols x time matrices"""
+    symbols = [symbol for symbol, df in frames.items() if len(df) >= rows]
+    closes = np.empty((len(symbols), rows))
+    volumes = np.empty((len(symbols), rows))
+    for i, symbol in enumerate(symbols):
+        tail = frames[symbol].tail(rows)
+        closes[i] = tail['Close'].to_numpy(dtype=np.float64)
+        volumes[i] = tail['Volume'].to_numpy(dtype=np.float64)
+    return symbols, closes, volumes
+
+
+def score_matrix(closes, volumes, minutes=max(TIMEFRAMES)):
+    """Vectorized equivalent of MarketAnalyzer._score_timeframe for every row at once"""
+    bars = timeframe_bars(minutes)
+    ema_7 = indicator_kernels.ema(closes, 7)[:, -1]
+    ema_21 = indicator_kernels.ema(closes, 21)[:, -1]
+    rsi = indicator_kernels.rsi(closes)[:, -1]
+    macd, macd_signal = indicator_kernels.macd(closes)
+    upper_band, lower_band = indicator_kernels.bollinger_bands(closes)
+    price = closes[:, -1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        start_price = closes[:, -bars]
+        change = (price - start_price) / start_price * 100
+
+        avg_volume = volumes[:, -bars:].mean(axis=1)
+        volume_ratio = np.where(avg_volume > 0, volumes[:, -1] / avg_volume, 1.0)
+        volume_strength = np.select(
+            [volume_ratio > 1.5, volume_ratio > 1.2, volume_ratio > 1.0], [3, 2, 1], default=0
+        )
+
+        ema_diff_percent = (ema_7 - ema_21) / ema_21 * 100
+
+    score = np.zeros(len(closes))
+    score += np.select([ema_diff_percent > 0.05, ema_diff_percent < -0.05], [1, -1], default=0)
+
+    macd_diff = macd[:, -1] - macd_signal[:, -1]
+    macd_trend = macd[:, -1] - macd[:, -2]
+    score += np.where(macd_diff > 0, 1 + (macd_trend > 0), -1 - (macd_trend < 0))
+
+    score += np.select([rsi < 35, rsi > 65, rsi < 45, rsi > 55], [3, -3, 1, -1], default=0)
+    score += np.select([price < lower_band[:, -1], price > upper_band[:, -1]], [2, -2], default=0)
+
+    strength = score * (1 + volume_strength * 0.2)
+    confidence = np.clip(50 + np.abs(strength) * 5, 50, 95)
+    signal = np.where(np.abs(strength) >= 1.2, np.where(strength > 0, 'BUY', 'SELL'), 'NEUTRAL')
+
+    return {
+        'price': price,
+        'change': change,
+        'rsi': rsi,
+        'macd': macd[:, -1],
+        'strength': strength,
+        'confidence': np.round(confidence, 1),
+        'signal': signal,
+    }
+
+
+def scan_market(symbols=None, top=5):
+    """Score every pair in one vectorized pass and return a ranked market overview"""
+    symbols = list(CURRENCY_PAIRS.values()) if symbols is None else list(symbols)
+    rows = analysis_rows()
+    matrix_symbols, closes, volumes = build_price_matrix(collect_frames(symbols), rows)
+    overview = {
+        'timestamp': datetime.now(),
+        'scanned': len(matrix_symbols),
+        'requested': len(symbols),
+        'signals': [],
+        'movers': [],
+        'oversold': [],
+        'overbought': [],
+    }
+    if not matrix_symbols:
+        logger.warning("Market scan found no cached data")
+        return overview
+
+    scores = score_matrix(closes, volumes)
+    entries = [
+        {
+            'symbol': symbol,
+            'pair': SYMBOL_NAMES.get(symbol, symbol),
+            'price': float(scores['price'][i]),
+            'change': float(scores['change'][i]),
+            'rsi': float(scores['rsi'][i]),
+            'signal': str(scores['signal'][i]),
+            'confidence': float(scores['confidence'][i]),
+            'strength': float(scores['strength'][i]),
+        }
+        for i, symbol in enumerate(matrix_symbols)
+    ]
+
+    active = [entry for entry in entries if entry['signal'] != 'NEUTRAL']
+    overview['signals'] = sorted(active, key=lambda entry: abs(entry['strength']), reverse=True)[:top]
+    overview['movers'] = sorted(entries, key=lambda entry: abs(np.nan_to_num(entry['change'])), reverse=True)[:top]
+    with_rsi = [entry for entry in entries if not np.isnan(entry['rsi'])]
+    overview['oversold'] = sorted((e for e in with_rsi if e['rsi'] < 30), key=lambda e: e['rsi'])[:top]
+    overview['overbought'] = sorted((e for e in with_rsi if e['rsi'] > 70), key=lambda e: -e['rsi'])[:top]
+    return overview
+
+
+def format_market_overview(overview):
+    """Plain-text market overview for the admin panel"""
+    signal_icons = {'BUY': '🟢', 'SELL': '🔴', 'NEUTRAL': '⚪'}
+    lines = [
+        "📈 Обзор рынка",
+        f"⌚ {overview['timestamp'].strftime('%H:%M:%S')} • пар: {overview['scanned']}/{overview['requested']}",
+        "",
+        "💪 Сильнейшие сигналы:",
+    ]
+    lines += [
+        f"{signal_icons[e['signal']]} {e['pair']}: {e['signal']} ({e['confidence']:.0f}%)"
+        for e in overview['signals']
+    ] or ["• Нет сильных сигналов"]
+
+    lines += ["", "🚀 Лидеры движения:"]
+    lines += [f"{'📈' if e['change'] >= 0 else '📉'} {e['pair']}: {e['change']:+.2f}%" for e in overview['movers']] or ["• Нет данных"]
+
+    lines += ["", "↘️ Перепроданность (RSI < 30):"]
+    lines += [f"• {e['pair']}: RSI {e['rsi']:.1f}" for e in overview['oversold']] or ["• Нет"]
+
+    lines += ["", "↗️ Перекупленность (RSI > 70):"]
+    lines += [f"• {e['pair']}: RSI {e['rsi']:.1f}" for e in overview['overbought']] or ["• Нет"]
+    return "\n".join(lines)
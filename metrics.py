@@ -0,0 +1,28 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def register_metrics(name, provider):
+    """Register a callable returning a dict of metrics under the given name"""
+    with _lock:
+        _providers[name] = provider
+
+
+def collect_metrics():
+    """Collect a snapshot of all registered metrics"""
+    with _lock:
+        providers = dict(_providers)
+
+    snapshot = {}
+    for name, provider in providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            logger.error(f"Error collecting metrics for {name}: {e}")
+            snapshot[name] = {'error': str(e)}
+    return snapshot
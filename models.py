@@ -900,9 +900,6 @@ def update_moderator_permission(permission_key, is_enabled):
         logger.error(f"Error updating moderator permission {permission_key}: {e}")
         return False
 
-# Initialize database tables
-init_db()
-
 # Функция для импорта стандартных сообщений бота
 def import_default_bot_messages():
     """Импортировать стандартные сообщения бота, если таблица пуста."""
@@ -975,6 +972,8 @@ def import_default_bot_messages():
         logger.error(f"Error importing default bot messages: {e}")
         return False
 
-# Import default data if needed
-import_default_currency_pairs()
-import_default_bot_messages()
\ No newline at end of file
+def setup_database():
+    """Create tables and import default data; run once at startup, not at import"""
+    init_db()
+    import_default_currency_pairs()
+    import_default_bot_messages()
\ No newline at end of file
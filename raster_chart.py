@@ -0,0 +1,199 @@
+import io
+import math
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import indicator_kernels
+
+# Same dark palette as the matplotlib chart
+BACKGROUND = (0x1a, 0x1b, 0x26)
+PANEL = (0x24, 0x28, 0x3b)
+GRID = (0x41, 0x48, 0x68)
+TEXT = (255, 255, 255)
+PRICE_COLOR = (255, 255, 255)
+EMA_FAST_COLOR = (0x00, 0xff, 0x00)
+EMA_SLOW_COLOR = (0xff, 0x6b, 0x6b)
+VOLUME_COLOR = (0x4a, 0x9e, 0xff)
+
+WIDTH, HEIGHT = 1200, 800
+# Plot areas as (left, top, right, bottom) pixel boxes
+PRICE_BOX = (80, 50, 1185, 540)
+VOLUME_BOX = (80, 600, 1185, 765)
+Y_TICKS = 6
+X_TICKS = 7
+EPOCH = datetime(1970, 1, 1)  # matplotlib date numbers count days from here
+
+
+def _blend(color, background, alpha):
+    return tuple(round(alpha * c + (1 - alpha) * b) for c, b in zip(color, background))
+
+
+GRID_ON_PANEL = _blend(GRID, PANEL, 0.3)
+EMA_FAST_ON_PANEL = _blend(EMA_FAST_COLOR, PANEL, 0.7)
+EMA_SLOW_ON_PANEL = _blend(EMA_SLOW_COLOR, PANEL, 0.7)
+VOLUME_ON_PANEL = _blend(VOLUME_COLOR, PANEL, 0.3)
+
+
+def nice_ticks(low, high, count=Y_TICKS):
+    """Round tick values covering [low, high]"""
+    span = high - low
+    if span <= 0:
+        return [low]
+    raw_step = span / count
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw_step)
+    first = math.ceil(low / step) * step
+    return [first + i * step for i in range(int((high - first) / step) + 1)]
+
+
+def _tick_label(value, step):
+    decimals = max(0, -math.floor(math.log10(step))) if step > 0 else 2
+    return f"{value:.{decimals}f}"
+
+
+# Palette indices for everything drawn per render; the static background uses the indices below them
+DYNAMIC_COLORS = (PANEL, TEXT, GRID_ON_PANEL, EMA_FAST_ON_PANEL, EMA_SLOW_ON_PANEL, VOLUME_ON_PANEL)
+BACKGROUND_COLORS = 256 - len(DYNAMIC_COLORS)
+PANEL_INDEX, TEXT_INDEX, GRID_INDEX, EMA_FAST_INDEX, EMA_SLOW_INDEX, VOLUME_INDEX = range(BACKGROUND_COLORS, 256)
+
+
+class RasterChart:
+    """Draws the analysis chart straight into an 8-bit palette pixel buffer.
+
+    Panels, titles and the legend are painted once (anti-aliased, then quantized)
+    into a background array; each render copies it and adds grid, axis labels,
+    volume bars and lines. Palette images keep PNG encoding cheap.
+    """
+
+    def __init__(self):
+        self.font = ImageFont.load_default(size=13)
+        self.title_font = ImageFont.load_default(size=16)
+        self.background, self.palette = self._build_background()
+
+    def _build_background(self):
+        pixels = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        pixels[:] = BACKGROUND
+        for left, top, right, bottom in (PRICE_BOX, VOLUME_BOX):
+            pixels[top:bottom, left:right] = PANEL
+            pixels[bottom, left:right] = GRID  # Bottom and left spines
+            pixels[top:bottom + 1, left] = GRID
+
+        image = Image.fromarray(pixels)
+        draw = ImageDraw.Draw(image)
+        draw.text(((PRICE_BOX[0] + PRICE_BOX[2]) / 2, PRICE_BOX[1] - 22), 'Price Analysis',
+                  fill=TEXT, font=self.title_font, anchor='mm')
+        draw.text(((VOLUME_BOX[0] + VOLUME_BOX[2]) / 2, VOLUME_BOX[1] - 18), 'Volume',
+                  fill=TEXT, font=self.title_font, anchor='mm')
+
+        # Legend in the top-left corner of the price panel
+        left, top = PRICE_BOX[0] + 10, PRICE_BOX[1] + 10
+        draw.rectangle((left, top, left + 110, top + 70), fill=PANEL, outline=GRID)
+        for i, (label, color, width) in enumerate((('Price', PRICE_COLOR, 2), ('EMA 7', EMA_FAST_ON_PANEL, 1),
+                                                   ('EMA 21', EMA_SLOW_ON_PANEL, 1))):
+            y = top + 13 + i * 21
+            draw.line((left + 8, y, left + 36, y), fill=color, width=width)
+            draw.text((left + 44, y), label, fill=TEXT, font=self.font, anchor='lm')
+
+        quantized = image.quantize(colors=BACKGROUND_COLORS, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        palette = quantized.getpalette()[:BACKGROUND_COLORS * 3]
+        palette += [0] * (BACKGROUND_COLORS * 3 - len(palette))
+        for color in DYNAMIC_COLORS:
+            palette.extend(color)
+
+        background = np.asarray(quantized).copy()
+        # Panels use the exact panel color so per-render fills blend in
+        for left, top, right, bottom in (PRICE_BOX, VOLUME_BOX):
+            area = background[top:bottom, left + 1:right]
+            panel_index = np.bincount(area.ravel()).argmax()
+            area[area == panel_index] = PANEL_INDEX
+        return background, palette
+
+    @staticmethod
+    def _scale(values, low, high, top, bottom):
+        return bottom - (values - low) / (high - low) * (bottom - top)
+
+    def render(self, x, close, volume):
+        """PNG bytes for date numbers x with close and volume series"""
+        x = np.asarray(x, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        ema_fast = indicator_kernels.ema(close, 7)
+        ema_slow = indicator_kernels.ema(close, 21)
+
+        pixels = self.background.copy()
+        left, top, right, bottom = PRICE_BOX
+        v_left, v_top, v_right, v_bottom = VOLUME_BOX
+
+        step = np.median(np.diff(x)) if len(x) > 1 else 1 / 1440.0
+        x_low, x_high = x.min() - step, x.max() + step
+        px = left + (x - x_low) / (x_high - x_low) * (right - left)
+
+        low = min(close.min(), ema_fast.min(), ema_slow.min())
+        high = max(close.max(), ema_fast.max(), ema_slow.max())
+        pad = (high - low) * 0.05 or abs(high) * 0.001 or 1.0
+        low, high = low - pad, high + pad
+        volume_high = (volume.max() if len(volume) else 1.0) * 1.05 or 1.0
+
+        # Grid lines at the price and volume ticks and at evenly spaced bars
+        price_ticks = nice_ticks(low, high)
+        price_rows = self._scale(np.array(price_ticks), low, high, top, bottom).astype(int)
+        pixels[price_rows[(price_rows > top) & (price_rows < bottom)], left + 1:right:2] = GRID_INDEX
+        volume_ticks = nice_ticks(0.0, volume_high, 4)
+        volume_rows = self._scale(np.array(volume_ticks), 0.0, volume_high, v_top, v_bottom).astype(int)
+        pixels[volume_rows[(volume_rows > v_top) & (volume_rows < v_bottom)], v_left + 1:v_right:2] = GRID_INDEX
+        label_indices = np.unique(np.linspace(0, len(x) - 1, min(X_TICKS, len(x))).round().astype(int))
+        for column in px[label_indices].astype(int):
+            pixels[top:bottom:2, column] = GRID_INDEX
+            pixels[v_top:v_bottom:2, column] = GRID_INDEX
+
+        # Volume bars filled directly in the array
+        half_width = max(1, int(0.4 * step / (x_high - x_low) * (right - left)))
+        bar_tops = self._scale(volume, 0.0, volume_high, v_top, v_bottom).astype(int)
+        for center, bar_top in zip(px.astype(int), bar_tops):
+            pixels[max(bar_top, v_top):v_bottom,
+                   max(center - half_width, v_left + 1):min(center + half_width, v_right)] = VOLUME_INDEX
+
+        image = Image.fromarray(pixels)
+        image.putpalette(self.palette)
+        draw = ImageDraw.Draw(image)
+        for series, color, width in ((ema_slow, EMA_SLOW_INDEX, 1), (ema_fast, EMA_FAST_INDEX, 1),
+                                     (close, TEXT_INDEX, 2)):
+            points = np.column_stack([px, self._scale(series, low, high, top, bottom)])
+            draw.line(points.ravel().tolist(), fill=color, width=width, joint='curve')
+
+        price_step = price_ticks[1] - price_ticks[0] if len(price_ticks) > 1 else 1.0
+        for value, row in zip(price_ticks, price_rows):
+            if top <= row <= bottom:
+                draw.text((left - 6, row), _tick_label(value, price_step), fill=TEXT_INDEX, font=self.font, anchor='rm')
+        volume_step = volume_ticks[1] - volume_ticks[0] if len(volume_ticks) > 1 else 1.0
+        for value, row in zip(volume_ticks, volume_rows):
+            if v_top <= row <= v_bottom:
+                label = f"{value:,.0f}" if volume_step >= 1 else _tick_label(value, volume_step)
+                draw.text((v_left - 6, row), label, fill=TEXT_INDEX, font=self.font, anchor='rm')
+        for index in label_indices:
+            label = (EPOCH + timedelta(days=float(x[index]))).strftime('%H:%M')
+            column = int(px[index])
+            draw.text((column, bottom + 8), label, fill=TEXT_INDEX, font=self.font, anchor='mt')
+            draw.text((column, v_bottom + 8), label, fill=TEXT_INDEX, font=self.font, anchor='mt')
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG', compress_level=1)
+        return buffer.getvalue()
+
+
+_local = threading.local()
+
+
+def get_raster_chart():
+    """Raster chart of the current worker thread, built on first use"""
+    chart = getattr(_local, 'chart', None)
+    if chart is None:
+        chart = _local.chart = RasterChart()
+    return chart
+
+
+def render_raster(x, close, volume):
+    return get_raster_chart().render(x, close, volume)
@@ -0,0 +1,228 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+from config import (
+    FETCH_MAX_ATTEMPTS, FETCH_DEADLINE, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+    HEDGE_ENABLED, HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY
+)
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct):
+        """Latency at the given percentile, or None until enough samples are collected"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def stats(self):
+        p50, p95 = self.percentile(50), self.percentile(95)
+        return {
+            'samples': len(self._samples),
+            'p50': round(p50, 4) if p50 is not None else None,
+            'p95': round(p95, 4) if p95 is not None else None,
+        }
+
+
+class AttemptTracker:
+    """Handed to each attempt: the time left before the deadline, and a mark_sent() hook
+    for the moment the request leaves our own queue for the upstream"""
+
+    def __init__(self, deadline=None, loop=None):
+        self.deadline = deadline
+        self.sent_at = None
+        self._loop = loop
+        self._sent = asyncio.Event() if loop is not None else None
+
+    def clock(self):
+        return self._loop.time() if self._loop is not None else time.monotonic()
+
+    def remaining(self):
+        """Seconds left before the deadline, or None without one"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - self.clock())
+
+    def mark_sent(self):
+        """Safe to call from any thread"""
+        self.sent_at = self.clock()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._sent.set)
+
+    async def wait_sent(self):
+        await self._sent.wait()
+
+
+class RetryPolicy:
+    """Retries with a total deadline, full-jitter backoff and p95 hedging.
+
+    Attempt callables take (attempt, hedge, tracker) and return (result, error_key, should_retry),
+    the same contract as MarketAnalyzer._fetch_attempt. Latency is measured from
+    tracker.mark_sent(), so time queued behind our own limiter neither feeds p95 nor
+    triggers hedges.
+    """
+
+    def __init__(self, max_attempts=FETCH_MAX_ATTEMPTS, deadline=FETCH_DEADLINE,
+                 base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY, hedge=HEDGE_ENABLED,
+                 hedge_default_delay=HEDGE_DEFAULT_DELAY, hedge_min_delay=HEDGE_MIN_DELAY):
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_default_delay = hedge_default_delay
+        self.hedge_min_delay = hedge_min_delay
+        self.latency = LatencyTracker()
+        self._background = set()
+        self.requests = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    def backoff_delay(self, attempt):
+        """Full-jitter backoff: uniform in [0, min(max_delay, base_delay * 2**attempt)]"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def hedge_delay(self):
+        p95 = self.latency.percentile(95)
+        if p95 is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p95)
+
+    def run_sync(self, attempt_func):
+        """Blocking variant without hedging. Returns (result, error_key)"""
+        self.requests += 1
+        error_key = None
+        for attempt in range(self.max_attempts):
+            tracker = AttemptTracker()
+            result, error_key, should_retry = attempt_func(attempt, False, tracker)
+            if tracker.sent_at is not None:
+                self.latency.record(tracker.clock() - tracker.sent_at)
+            if result is not None:
+                return result, None
+            if not should_retry or attempt == self.max_attempts - 1:
+                break
+            self.retries += 1
+            time.sleep(self.backoff_delay(attempt))
+        return None, error_key
+
+    async def _timed(self, attempt_func, attempt, hedge, tracker):
+        outcome = await attempt_func(attempt, hedge, tracker)
+        if tracker.sent_at is not None:
+            self.latency.record(tracker.clock() - tracker.sent_at)
+        return outcome
+
+    async def _hedged_attempt(self, attempt_func, attempt, deadline):
+        """One attempt, plus a hedge if the upstream is slower than p95. Returns the first success"""
+        loop = asyncio.get_running_loop()
+        tracker = AttemptTracker(deadline, loop)
+        primary = asyncio.ensure_future(self._timed(attempt_func, attempt, False, tracker))
+        pending = {primary}
+        hedge_task = None
+
+        if self.hedge:
+            # The hedge timer starts once the request is sent; a primary still queued behind
+            # our own limiter is never hedged, that would only add to the queue
+            sent = asyncio.ensure_future(tracker.wait_sent())
+            await asyncio.wait({primary, sent}, timeout=max(0.0, deadline - loop.time()),
+                               return_when=asyncio.FIRST_COMPLETED)
+            sent.cancel()
+            if not primary.done() and tracker.sent_at is not None:
+                delay = tracker.sent_at + self.hedge_delay() - loop.time()
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, min(delay, deadline - loop.time())))
+                if not done and loop.time() < deadline:
+                    self.hedges += 1
+                    logger.debug(f"Attempt {attempt + 1} slower than {self.hedge_delay():.2f}s, hedging")
+                    hedge_task = asyncio.ensure_future(
+                        self._timed(attempt_func, attempt, True, AttemptTracker(deadline, loop))
+                    )
+                    pending.add(hedge_task)
+
+        outcome = None
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for task in done:
+                outcome = task.result()
+                if outcome[0] is not None:
+                    if task is hedge_task:
+                        self.hedge_wins += 1
+                    pending = set()
+                    break
+
+        # Let the losing fetch finish in the background so its latency still feeds p95
+        for task in pending:
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return outcome
+
+    async def run(self, attempt_func):
+        """Run async attempt_func until it succeeds, gives up or the deadline passes.
+
+        Returns (result, error_key). error_key is 'DEADLINE' when our own budget ran out
+        while an attempt was still pending.
+        """
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        error_key = None
+
+        for attempt in range(self.max_attempts):
+            outcome = await self._hedged_attempt(attempt_func, attempt, deadline)
+            if outcome is None:
+                self.deadline_exceeded += 1
+                return None, 'DEADLINE'
+
+            result, error_key, should_retry = outcome
+            if result is not None:
+                return result, None
+            if not should_retry or attempt == self.max_attempts - 1:
+                break
+
+            delay = self.backoff_delay(attempt)
+            if loop.time() + delay >= deadline:
+                self.deadline_exceeded += 1
+                break
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+        return None, error_key
+
+    def stats(self):
+        return {
+            **self.latency.stats(),
+            'hedge_delay': round(self.hedge_delay(), 4),
+            'requests': self.requests,
+            'retries': self.retries,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'deadline_exceeded': self.deadline_exceeded,
+        }
+
+
+fetch_policy = RetryPolicy()
+register_metrics('fetch_policy', fetch_policy.stats)
@@ -18,5 +18,8 @@ setup(
         'python-dotenv>=1.0.0',
         'matplotlib>=3.10.1',
     ],
+    extras_require={
+        'yahoo_chart': ['aiohttp>=3.9'],  # MARKET_DATA_PROVIDER=yahoo_chart
+    },
     python_requires='>=3.9',
 )
\ No newline at end of file
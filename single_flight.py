@@ -0,0 +1,50 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent coroutine calls that share a key into one execution"""
+
+    def __init__(self):
+        self._in_flight = {}
+        self.calls = 0
+        self.executions = 0
+        self.deduplicated = 0
+
+    async def run(self, key, func, *args, **kwargs):
+        """Await func(*args, **kwargs), joining an in-flight call for the same key if any"""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is not None and task.get_loop() is not asyncio.get_running_loop():
+            # Left behind by an event loop that has since stopped (the bot restarts its
+            # Application on errors); it will never finish, so start over on this loop
+            logger.debug(f"Dropping in-flight call for {key} from a previous event loop")
+            del self._in_flight[key]
+            task = None
+        if task is not None:
+            self.deduplicated += 1
+            logger.debug(f"Joining in-flight call for {key}")
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+
+        # Shield so that a cancelled caller does not cancel the shared work
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"In-flight call for {key} failed: {task.exception()}")
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'deduplicated': self.deduplicated,
+            'in_flight': len(self._in_flight),
+        }
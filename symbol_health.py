@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+
+from config import SYMBOL_FAILURE_COOLDOWN, SYMBOL_FLAG_AFTER, SYMBOL_FLAGGED_COOLDOWN
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+# Outcomes worth remembering: the upstream has nothing for the symbol or keeps timing out
+COOLDOWN_ERRORS = ('NO_DATA', 'TIMEOUT_ERROR')
+# Outcomes caused by our own limits rather than the upstream; never held against a symbol
+LOCAL_ERRORS = ('BUSY', 'DEADLINE')
+
+
+class SymbolHealthTracker:
+    """Per-symbol fetch outcomes with a cooldown for symbols that keep failing"""
+
+    def __init__(self, cooldown=SYMBOL_FAILURE_COOLDOWN, flag_after=SYMBOL_FLAG_AFTER,
+                 flagged_cooldown=SYMBOL_FLAGGED_COOLDOWN):
+        self.cooldown = cooldown
+        self.flag_after = flag_after
+        self.flagged_cooldown = flagged_cooldown
+        self._lock = threading.Lock()
+        self._symbols = {}
+        self.skipped = 0
+
+    def _entry(self, symbol):
+        return self._symbols.setdefault(symbol, {
+            'successes': 0,
+            'failures': 0,
+            'consecutive_failures': 0,
+            'last_error': None,
+            'last_success': None,
+            'last_failure': None,
+            'cooldown_until': 0.0,
+        })
+
+    def record_success(self, symbol):
+        with self._lock:
+            entry = self._entry(symbol)
+            if entry['consecutive_failures'] >= self.flag_after:
+                logger.info(f"Symbol {symbol} recovered after {entry['consecutive_failures']} failures")
+            entry['successes'] += 1
+            entry['consecutive_failures'] = 0
+            entry['last_success'] = time.time()
+            entry['cooldown_until'] = 0.0
+
+    def record_failure(self, symbol, error_key):
+        """Remember a failed fetch; NO_DATA/TIMEOUT put the symbol on cooldown"""
+        if error_key in LOCAL_ERRORS:
+            return
+        now = time.time()
+        with self._lock:
+            entry = self._entry(symbol)
+            entry['failures'] += 1
+            entry['consecutive_failures'] += 1
+            entry['last_error'] = error_key
+            entry['last_failure'] = now
+            if error_key not in COOLDOWN_ERRORS:
+                return
+            flagged = entry['consecutive_failures'] >= self.flag_after
+            entry['cooldown_until'] = now + (self.flagged_cooldown if flagged else self.cooldown)
+            if entry['consecutive_failures'] == self.flag_after:
+                logger.warning(f"Symbol {symbol} flagged after {self.flag_after} consecutive failures ({error_key})")
+
+    def cooldown_error(self, symbol):
+        """Cached error key while the symbol is cooling down, otherwise None"""
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            if entry is None or entry['cooldown_until'] <= time.time():
+                return None
+            self.skipped += 1
+            return entry['last_error']
+
+    def is_cooling_down(self, symbol):
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            return entry is not None and entry['cooldown_until'] > time.time()
+
+    def is_flagged(self, symbol):
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            return entry is not None and entry['consecutive_failures'] >= self.flag_after
+
+    def status(self, symbol):
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            return dict(entry) if entry else None
+
+    def reset(self, symbol=None):
+        """Forget recorded outcomes for one symbol or all of them"""
+        with self._lock:
+            if symbol is None:
+                self._symbols.clear()
+            else:
+                self._symbols.pop(symbol, None)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {
+                'tracked': len(self._symbols),
+                'cooling_down': sum(1 for e in self._symbols.values() if e['cooldown_until'] > now),
+                'flagged': sorted(s for s, e in self._symbols.items()
+                                  if e['consecutive_failures'] >= self.flag_after),
+                'skipped_fetches': self.skipped,
+            }
+
+
+symbol_health = SymbolHealthTracker()
+register_metrics('symbol_health', symbol_health.stats)
@@ -0,0 +1,311 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from config import UPSTREAM_MAX_CONCURRENCY, UPSTREAM_RATE, UPSTREAM_BURST, UPSTREAM_QUEUE_TIMEOUT
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamBusy(Exception):
+    """Our own gate or request budget refused the call; says nothing about the upstream"""
+
+
+class TokenBucket:
+    """Request budget refilled at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, timeout):
+        """Take a token, returning how long the caller has to wait before using it, or None
+        (and no token) if that would take longer than timeout"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if timeout is not None and wait > timeout:
+                return None
+            self._tokens -= 1
+            return wait
+
+    def acquire(self, timeout=None):
+        """Block until a token is available. Returns False if it would take longer than timeout"""
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, timeout=None):
+        """Non-blocking variant of acquire"""
+        wait = self._reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+
+class SlotGate:
+    """Counting semaphore that threads and asyncio tasks wait on alike, in FIFO order.
+
+    Each waiter is a concurrent Future the releasing side resolves, so a queued asyncio
+    task holds no thread while it waits.
+    """
+
+    def __init__(self, slots):
+        self._free = slots
+        self._waiters = deque()
+        self._lock = threading.Lock()
+
+    def _enqueue(self):
+        """Take a free slot (returns None) or queue up for one (returns the waiter)"""
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return None
+            waiter = Future()
+            self._waiters.append(waiter)
+            return waiter
+
+    def acquire(self, timeout=None):
+        waiter = self._enqueue()
+        if waiter is None:
+            return True
+        try:
+            waiter.result(timeout)
+            return True
+        except FutureTimeout:
+            # cancel() fails if the slot was handed over just as we gave up
+            return not waiter.cancel()
+
+    async def acquire_async(self, timeout=None):
+        waiter = self._enqueue()
+        if waiter is None:
+            return True
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(waiter)), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return not waiter.cancel()
+        except asyncio.CancelledError:
+            if not waiter.cancel():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if waiter.set_running_or_notify_cancel():  # False for waiters that gave up
+                    waiter.set_result(True)
+                    return
+            self._free += 1
+
+
+class UpstreamLimiter:
+    """Bounded concurrency gate plus a token-bucket budget in front of the data provider.
+
+    Calls sharing a key are coalesced: while one is queued or running, later callers
+    wait for and share its result instead of sending another request. call_async()
+    waits in the event loop and only takes a thread to run the request itself.
+    """
+
+    def __init__(self, max_concurrent=UPSTREAM_MAX_CONCURRENCY, rate=UPSTREAM_RATE,
+                 burst=UPSTREAM_BURST, queue_timeout=UPSTREAM_QUEUE_TIMEOUT):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._gate = SlotGate(max_concurrent)
+        self._bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.calls = 0
+        self.executions = 0
+        self.joined = 0
+        self.rejected = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.active = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _queued(self):
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        return time.monotonic()
+
+    def _admitted(self, started, acquired, reason):
+        """Book the outcome of a wait for a slot and a token. Returns the time spent waiting"""
+        waited = time.monotonic() - started
+        with self._lock:
+            self.queue_depth -= 1
+            if not acquired:
+                self.rejected += 1
+            else:
+                self.active += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+        if not acquired:
+            raise UpstreamBusy(reason)
+        return waited
+
+    def _wait_limit(self, wait_timeout):
+        if wait_timeout is None:
+            return self.queue_timeout
+        return max(0.0, min(self.queue_timeout, wait_timeout))
+
+    def _acquire(self, wait_timeout=None):
+        """Wait for a concurrency slot and a token. Returns the time spent waiting"""
+        limit = self._wait_limit(wait_timeout)
+        started = self._queued()
+        if not self._gate.acquire(timeout=limit):
+            return self._admitted(started, False, "Timed out waiting for an upstream slot")
+        remaining = limit - (time.monotonic() - started)
+        if not self._bucket.acquire(timeout=max(0.0, remaining)):
+            self._gate.release()
+            return self._admitted(started, False, "Upstream request budget exhausted")
+        return self._admitted(started, True, None)
+
+    async def _acquire_async(self, wait_timeout=None):
+        """Non-blocking variant of _acquire"""
+        limit = self._wait_limit(wait_timeout)
+        started = self._queued()
+        try:
+            if not await self._gate.acquire_async(timeout=limit):
+                return self._admitted(started, False, "Timed out waiting for an upstream slot")
+            remaining = limit - (time.monotonic() - started)
+            try:
+                acquired = await self._bucket.acquire_async(timeout=max(0.0, remaining))
+            except asyncio.CancelledError:
+                self._gate.release()
+                raise
+            if not acquired:
+                self._gate.release()
+                return self._admitted(started, False, "Upstream request budget exhausted")
+        except asyncio.CancelledError:
+            with self._lock:
+                self.queue_depth -= 1
+            raise
+        return self._admitted(started, True, None)
+
+    def _release(self):
+        with self._lock:
+            self.active -= 1
+        self._gate.release()
+
+    def _join_or_lead(self, key, on_start):
+        """The in-flight call for key and whether this caller has to run the request.
+
+        An in-flight call is a (result, started) pair of Futures; started resolves once the
+        leader holds a slot and a token, and on_start runs then, for joiners too.
+        """
+        with self._lock:
+            self.calls += 1
+            entry = self._in_flight.get(key)
+            leader = entry is None
+            if leader:
+                self.executions += 1
+                entry = self._in_flight[key] = (Future(), Future())
+            else:
+                self.joined += 1
+        if on_start is not None:
+            def notify(started):
+                if not started.cancelled():
+                    on_start()
+            entry[1].add_done_callback(notify)
+        if not leader:
+            logger.debug(f"Joining in-flight upstream request for {key}")
+        return entry, leader
+
+    def _finish(self, key, entry):
+        entry[1].cancel()  # No-op once started; tells waiting joiners the request never went out
+        with self._lock:
+            if self._in_flight.get(key) is entry:
+                del self._in_flight[key]
+
+    def call(self, key, func, *args, wait_timeout=None, on_start=None, **kwargs):
+        """Run func(*args, **kwargs) through the gate, joining an in-flight call for the same key.
+
+        wait_timeout caps the wait for a slot below queue_timeout; on_start is called once
+        the request holds a slot and a token, so time spent queued can be told apart.
+        """
+        entry, leader = self._join_or_lead(key, on_start)
+        future, started = entry
+        if not leader:
+            return future.result()
+
+        try:
+            waited = self._acquire(wait_timeout)
+            if waited > 1:
+                logger.info(f"Upstream request for {key} waited {waited:.2f}s for a slot")
+            started.set_result(None)
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                self._release()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, entry)
+
+    async def call_async(self, key, func, *args, wait_timeout=None, on_start=None):
+        """Non-blocking variant of call: queues in the event loop, runs blocking func in a thread"""
+        entry, leader = self._join_or_lead(key, on_start)
+        future, started = entry
+        if not leader:
+            # Shielded so that a cancelled joiner does not cancel the shared request
+            return await asyncio.shield(asyncio.wrap_future(future))
+
+        try:
+            waited = await self._acquire_async(wait_timeout)
+            if waited > 1:
+                logger.info(f"Upstream request for {key} waited {waited:.2f}s for a slot")
+            started.set_result(None)
+            try:
+                result = await asyncio.to_thread(func, *args)
+            finally:
+                self._release()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, entry)
+
+    def stats(self):
+        with self._lock:
+            executions = self.executions - self.rejected
+            return {
+                'max_concurrent': self.max_concurrent,
+                'active': self.active,
+                'queue_depth': self.queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'calls': self.calls,
+                'executions': self.executions,
+                'joined': self.joined,
+                'rejected': self.rejected,
+                'avg_wait': round(self.total_wait / executions, 4) if executions > 0 else 0.0,
+                'max_wait': round(self.max_wait, 4),
+            }
+
+
+upstream_limiter = UpstreamLimiter()
+register_metrics('upstream_limiter', upstream_limiter.stats)
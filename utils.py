@@ -122,6 +122,11 @@ def format_signal_message(pair, analysis_result, lang_code='tg'):
         f"💵 {escape_markdown(messages['CURRENT_PRICE'])}: `{current_price:.4f}`\n"
     ]
 
+    if analysis_result.get('stale'):
+        age_minutes = max(1, round(analysis_result.get('age', 0) / 60))
+        age_text = messages['DATA_AGE'].format(f"{age_minutes} {messages['MINUTES']}")
+        result_parts.insert(2, f"🕓 _{escape_markdown(age_text)}_")
+
     for minutes, data in sorted(timeframes.items()):
         if not data or not isinstance(data, dict):
             continue
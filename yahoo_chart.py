@@ -0,0 +1,177 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from bar_store import BAR_DTYPE, EMPTY_BARS, normalize_bars
+from config import YAHOO_CHART_URL, YAHOO_CHART_POOL_SIZE, YAHOO_CHART_TIMEOUT, YAHOO_CHART_KEEPALIVE, HTTP_DNS_TTL
+from market_cache import interval_to_seconds
+from metrics import register_metrics
+
+try:
+    import aiohttp
+except ImportError:  # Optional 'yahoo_chart' extra, only needed by the yahoo_chart provider
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+
+def _column(quote_data, field, length):
+    values = quote_data.get(field)
+    if values is None:
+        return np.full(length, np.nan)
+    # None entries (no trades in the bar) become NaN
+    return np.array(values, dtype=np.float64)
+
+
+def parse_chart(payload, interval=None):
+    """Decode a v8 chart API payload straight into a BAR_DTYPE array"""
+    chart = payload.get('chart') or {}
+    results = chart.get('result') or []
+    if not results:
+        error = chart.get('error') or {}
+        logger.warning(f"Chart API returned no result: {error.get('description', 'unknown error')}")
+        return EMPTY_BARS
+
+    result = results[0]
+    timestamps = result.get('timestamp') or []
+    quotes = (result.get('indicators') or {}).get('quote') or []
+    if not timestamps or not quotes:
+        return EMPTY_BARS
+
+    length = len(timestamps)
+    bars = np.empty(length, dtype=BAR_DTYPE)
+    bars['ts'] = np.asarray(timestamps, dtype=np.int64)
+    if interval:
+        # The live bar is stamped with the last trade time; align it to its bar open
+        bar_seconds = interval_to_seconds(interval)
+        bars['ts'] -= bars['ts'] % bar_seconds
+    for field in ('open', 'high', 'low', 'close'):
+        bars[field] = _column(quotes[0], field, length)
+    bars['volume'] = np.nan_to_num(_column(quotes[0], 'volume', length), nan=0.0)
+
+    bars = bars[~np.isnan(bars['close'])]
+    return normalize_bars(bars)
+
+
+def _epoch(value):
+    return int(value.timestamp())
+
+
+class YahooChartClient:
+    """Async client for the Yahoo chart endpoint running on its own event loop thread.
+
+    One pooled keep-alive session is shared by every request; blocking callers use
+    fetch/fetch_many, which hand the coroutine to the client loop and wait.
+    """
+
+    def __init__(self, base_url=YAHOO_CHART_URL, pool_size=YAHOO_CHART_POOL_SIZE, timeout=YAHOO_CHART_TIMEOUT):
+        if aiohttp is None:
+            raise RuntimeError("aiohttp is required for the yahoo_chart provider: pip install '.[yahoo_chart]'")
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._session = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='yahoo-chart', daemon=True)
+        self._thread.start()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.total_latency = 0.0
+
+    def _get_session(self):
+        # Created lazily so it binds to the client loop
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size, ttl_dns_cache=HTTP_DNS_TTL, keepalive_timeout=YAHOO_CHART_KEEPALIVE
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'User-Agent': USER_AGENT},
+            )
+        return self._session
+
+    async def fetch_async(self, symbol, start, end, interval):
+        """Bars for symbol with open times in [start, end). Must run on the client loop"""
+        params = {
+            'period1': _epoch(start),
+            'period2': _epoch(end),
+            'interval': interval,
+            'includePrePost': 'true',
+        }
+        started = time.monotonic()
+        self.requests += 1
+        try:
+            async with self._get_session().get(self.base_url.format(symbol=quote(symbol)), params=params) as response:
+                body = await response.read()
+                self.bytes_received += len(body)
+                # Unknown or delisted symbols come back as 404 with an error payload
+                if response.status != 404:
+                    response.raise_for_status()
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self.total_latency += time.monotonic() - started
+
+        bars = parse_chart(json.loads(body), interval)
+        end_ts = _epoch(end)
+        return bars[bars['ts'] < end_ts] if len(bars) else bars
+
+    async def _fetch_many_async(self, symbols, start, end, interval):
+        responses = await asyncio.gather(
+            *(self.fetch_async(symbol, start, end, interval) for symbol in symbols),
+            return_exceptions=True
+        )
+        results = {}
+        for symbol, bars in zip(symbols, responses):
+            if isinstance(bars, Exception):
+                logger.error(f"Error fetching {symbol} from chart API: {bars}")
+                continue
+            results[symbol] = bars
+        return results
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def fetch(self, symbol, start, end, interval):
+        return self._run(self.fetch_async(symbol, start, end, interval))
+
+    def fetch_many(self, symbols, start, end, interval):
+        """Fetch all symbols concurrently over the shared connection pool"""
+        return self._run(self._fetch_many_async(list(symbols), start, end, interval))
+
+    def close(self):
+        if self._session is not None:
+            self._run(self._session.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes_received': self.bytes_received,
+            'avg_latency': round(self.total_latency / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_chart_client():
+    """Process-wide chart client, created on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = YahooChartClient()
+            register_metrics('yahoo_chart', _client.stats)
+        return _client